@@ -80,6 +80,9 @@ DATABASES = {
         "PORT": "",
     }
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # Tests get a file rather than an in-memory database so concurrent writers can be tested (see web.tests)
+    DATABASES["default"]["TEST"] = {"NAME": config("DB_TEST_NAME", default=BASE_DIR / "test_db.sqlite3")}
 
 # Password validation
 # https://docs.djangoproject.com/en/4.1/ref/settings/#auth-password-validators
@@ -135,16 +138,86 @@ STATIC_FILE_ROOT = BASE_DIR / "static"
 STATICFILES_DIRS = ((BASE_DIR / "static"),)
 STATIC_ROOT = BASE_DIR / "assets"
 
+STORAGES = {
+    # Uploads are stored once per distinct content (see main.storage)
+    "default": {"BACKEND": "main.storage.ContentAddressedStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    # Thumbnails need the names easy_thumbnails gives them, so they bypass content addressing
+    "easy_thumbnails": {"BACKEND": "easy_thumbnails.storage.ThumbnailFileSystemStorage"},
+}
+
 
+# Aliases come in pairs of one aspect ratio so templates can offer both through srcset
 THUMBNAIL_ALIASES = {
     "": {
         "modal": {"size": (400, 250), "crop": True},
+        "modal_2x": {"size": (800, 500), "crop": True},
         "extra_small": {"size": (200, 200), "crop": True},
+        "extra_small_2x": {"size": (400, 400), "crop": True},
+        "small": {"size": (400, 600), "crop": False},
         "medium": {"size": (800, 1200), "crop": False},
+        "card": {"size": (400, 300), "crop": True},
+        "card_2x": {"size": (800, 600), "crop": True},
+        "banner_small": {"size": (830, 313), "crop": True},
         "banner": {"size": (1660, 625), "crop": True},
+        "logo": {"size": (0, 80)},
+        "logo_2x": {"size": (0, 160)},
     }
 }
 THUMBNAIL_BASEDIR = "thumbnails"
+THUMBNAIL_CACHE_DIMENSIONS = True
+
+# Uploaded images are scaled to fit this many pixels a side and re-encoded at this quality (see main.fields)
+IMAGE_MAX_SIZE = config("IMAGE_MAX_SIZE", default=2000, cast=int)
+IMAGE_QUALITY = config("IMAGE_QUALITY", default=80, cast=int)
+
+# Rendered pages, product fragments, and thumbnail and ad lists (see web.cache, web.images, web.ads).
+# Pages and fragments get caches of their own so neither evicts the other or the small entries in default.
+# The in-process default is per worker; set CACHE_BACKEND and CACHE_LOCATION to a shared cache such as
+# django.core.cache.backends.redis.RedisCache when running several.
+CACHE_BACKEND = config("CACHE_BACKEND", default="django.core.cache.backends.locmem.LocMemCache")
+CACHE_LOCATION = config("CACHE_LOCATION", default="")
+CACHE_MAX_ENTRIES = config("CACHE_MAX_ENTRIES", default=20000, cast=int)
+CACHES = {
+    alias: {
+        "BACKEND": CACHE_BACKEND,
+        "LOCATION": CACHE_LOCATION or alias,
+        "KEY_PREFIX": alias,
+        # Redis and memcached evict by memory and do not take MAX_ENTRIES
+        "OPTIONS": {}
+        if "redis" in CACHE_BACKEND or "memcached" in CACHE_BACKEND
+        else {"MAX_ENTRIES": CACHE_MAX_ENTRIES},
+    }
+    for alias in ("default", "pages", "fragments")
+}
+
+# Seconds a rendered public menu page is kept; edits invalidate it sooner (see web.cache)
+PAGE_CACHE_TIMEOUT = config("PAGE_CACHE_TIMEOUT", default=60 * 60 * 24, cast=int)
+
+# Seconds between writes of the buffered restaurant visitor counts (see web.visitors)
+VISITOR_COUNT_FLUSH_INTERVAL = config("VISITOR_COUNT_FLUSH_INTERVAL", default=30, cast=int)
+
+# Products rendered up front on the products page and per request of its feed (see web.feed)
+PRODUCT_FEED_PAGE_SIZE = config("PRODUCT_FEED_PAGE_SIZE", default=24, cast=int)
+
+# Anonymous sessions live in a signed cookie so menu visitors never add rows to django_session, while
+# signed-in users' stay in the database (see main.sessions); visitors' sessions are only started by the
+# first cart change (see web.cart.get_cart_id)
+SESSION_ENGINE = config("SESSION_ENGINE", default="main.sessions")
+SESSION_COOKIE_AGE = config("SESSION_COOKIE_AGE", default=60 * 60 * 24 * 14, cast=int)
+
+# Where visitors' carts are kept: web.cart.DatabaseCartStore or web.cart.SessionCartStore (see web.cart)
+CART_STORE = config("CART_STORE", default="web.cart.DatabaseCartStore")
+
+# Seconds a database cart line may sit untouched before sweep_carts deletes it (see web.cart);
+# by then the session holding its cart id has expired
+CART_TTL = config("CART_TTL", default=SESSION_COOKIE_AGE, cast=int)
+
+# Seconds a worker may hold a job before another worker takes it over (see main.jobs)
+JOB_TIMEOUT = config("JOB_TIMEOUT", default=60 * 10, cast=int)
+# Jobs run as soon as they are enqueued, in the enqueuing process. Set to False to queue them instead,
+# only once a run_worker process is deployed alongside the web processes: nothing else runs queued jobs.
+JOB_QUEUE_EAGER = config("JOB_QUEUE_EAGER", default=True, cast=bool)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.1/ref/settings/#default-auto-field
@@ -167,7 +240,9 @@ LOGIN_URL = "/accounts/login/"
 LOGOUT_URL = "/accounts/logout/"
 LOGIN_REDIRECT_URL = "/home"
 
-EMAIL_BACKEND = config("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+# Mail is sent through JOB_EMAIL_BACKEND, by run_worker when JOB_QUEUE_EAGER is off (see main.jobs)
+EMAIL_BACKEND = config("EMAIL_BACKEND", default="main.jobs.QueuedEmailBackend")
+JOB_EMAIL_BACKEND = config("JOB_EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
 EMAIL_HOST = config("EMAIL_HOST", default="")
 EMAIL_PORT = config("EMAIL_PORT", default=587)
 EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
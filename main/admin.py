@@ -18,6 +18,7 @@ from .models import (
     DefualtproductOption,
     District,
     Feedback,
+    Job,
     Notification,
     Option,
     Product,
@@ -98,13 +99,20 @@ class OptionInline(admin.TabularInline):
 @admin.register(Product)
 @admin_thumbnails.thumbnail("image")
 class ProductAdmin(ImportExportActionModelAdmin):
-    list_display = ("name", "subcategory", "description", "image")
+    list_display = ("name", "subcategory", "description", "image", "min_price")
     list_filter = ("name", "subcategory", "subcategory__category", "subcategory__category__restaurant")
     autocomplete_fields = ("subcategory",)
     readonly_fields = ("created_by",)
     search_fields = ("name", "description")
     inlines = (OptionInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_prices()
+
+    @admin.display(ordering="min_price")
+    def min_price(self, obj):
+        return obj.min_price
+
 
 @admin.register(Banner)
 @admin_thumbnails.thumbnail("image")
@@ -198,3 +206,10 @@ class DefaultProductAdmin(ImportExportActionModelAdmin):
 class DefaultSubcategoryAdmin(ImportExportActionModelAdmin):
     list_display = ("name", "category", "image")
     list_filter = ("category",)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_at", "locked_by")
+    list_filter = ("status", "name")
+    readonly_fields = ("created_at",)
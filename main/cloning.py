@@ -0,0 +1,114 @@
+import logging
+import time
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.dispatch import Signal
+
+from .jobs import job
+from .models import (
+    Category,
+    DefaultCategory,
+    DefaultProduct,
+    DefaultSubcategory,
+    DefualtproductOption,
+    Option,
+    Product,
+    Restaurant,
+    Subcategory,
+)
+from .stats import update_stats
+
+logger = logging.getLogger(__name__)
+
+# Sent with the restaurant and its new products from inside the cloning transaction, in place
+# of the post_save signals bulk_create does not send (see web.signals)
+catalogue_cloned = Signal()
+
+
+def clone_default_catalogue(restaurant):
+    """Copy the default catalogue into ``restaurant`` and return how many rows were created per level.
+
+    Each level of the default tree is read in one query and written with one
+    ``bulk_create``, all in one transaction. Primary keys are UUIDs made in
+    Python, so children are pointed at their new parents without reading them back.
+    bulk_create sends no signals, so the stats and file references they would have
+    updated are updated here, and ``catalogue_cloned`` is sent for the rest.
+    """
+    started = time.monotonic()
+    categories = {
+        default.pk: Category(
+            restaurant=restaurant, name=default.name, image=default.image.name, description=default.description
+        )
+        for default in DefaultCategory.objects.all()
+    }
+    subcategories = {
+        default.pk: Subcategory(
+            category=categories[default.category_id], name=default.name, description=default.description
+        )
+        for default in DefaultSubcategory.objects.all()
+    }
+    products = {
+        default.pk: Product(
+            subcategory=subcategories[default.subcategory_id],
+            name=default.name,
+            description=default.description,
+            ingredients=default.ingredients,
+            image=default.image.name,
+            is_popular=default.is_popular,
+            is_vegetarian=default.is_vegetarian,
+            display_foodtype=default.display_foodtype,
+            is_active=default.is_active,
+        )
+        for default in DefaultProduct.objects.all()
+    }
+    options = [
+        Option(product=products[default.product_id], section=default.section, name=default.name, price=default.price)
+        for default in DefualtproductOption.objects.all()
+    ]
+
+    with transaction.atomic():
+        for model, rows in (
+            (Category, categories.values()),
+            (Subcategory, subcategories.values()),
+            (Product, products.values()),
+            (Option, options),
+        ):
+            model.objects.bulk_create(rows)
+
+        # The copies share the default records' files
+        copied_images = Counter(row.image.name for row in [*categories.values(), *products.values()] if row.image)
+        for name, count in copied_images.items():
+            default_storage.retain(name, count)
+        update_stats(
+            restaurant.pk,
+            category_count=len(categories),
+            subcategory_count=len(subcategories),
+            product_count=sum(product.is_active for product in products.values()),
+            option_count=len(options),
+        )
+        catalogue_cloned.send(sender=Restaurant, restaurant=restaurant, products=list(products.values()))
+
+    created = {
+        "categories": len(categories),
+        "subcategories": len(subcategories),
+        "products": len(products),
+        "options": len(options),
+    }
+    logger.info(
+        "Cloned the default catalogue into %s (%s) in %.2fs",
+        restaurant.pk,
+        ", ".join(f"{n} {name}" for name, n in created.items()),
+        time.monotonic() - started,
+    )
+    return created
+
+
+@job
+def clone_catalogue(restaurant_id):
+    """Clone the default catalogue into a new restaurant from the job queue."""
+    restaurant = Restaurant.objects.get(pk=restaurant_id)
+    # A retried job may find its clone already committed.
+    if not Category.objects.filter(restaurant=restaurant).exists():
+        clone_default_catalogue(restaurant)
@@ -1,30 +1,38 @@
 from django.conf import settings
 from django.contrib.sites.models import Site
+from django.utils.functional import lazy
+
+SITE_NAME = "Ajoneedienen"
+
+# Every value that is the same for all requests.
+STATIC_CONTEXT = {
+    "site_name": SITE_NAME,
+    "logo_url": "/static/main/images/logo.png",
+    "favicon_url": "/static/main/images/logo_mini.svg",
+    "domain": "https://www.ajoneedienen.com",
+    "is_suspended": False,
+}
+
+site_ready = False
+
+
+def ensure_site(domain):
+    """Create the SITE_ID site if it is missing; checked on the first request of each process."""
+    global site_ready
+    if not site_ready:
+        Site.objects.get_or_create(pk=settings.SITE_ID, defaults={"domain": domain, "name": SITE_NAME})
+        site_ready = True
+
+
+def get_usertype(user):
+    if user.is_authenticated:
+        return "Administator" if user.is_superuser else "Shop"
+    return "Guest"
 
 
 def main_context(request):
-    is_suspended = False
-    if not request.session.exists(request.session.session_key):
-        request.session.create()
-
-    domain = request.META.get("HTTP_HOST", "")
-    site_name = "Ajoneedienen"
-    logo_url = "/static/main/images/logo.png"
-    favicon_url = "/static/main/images/logo_mini.svg"
-
-    if not Site.objects.filter(pk=settings.SITE_ID).exists():
-        new_site = Site(pk=settings.SITE_ID, domain=domain, name=site_name)
-        new_site.save()
-
-    if request.user.is_authenticated:
-        usertype = "Administator" if request.user.is_superuser else "Shop"
-    else:
-        usertype = "Guest"
-    return {
-        "site_name": site_name,
-        "logo_url": logo_url,
-        "favicon_url": favicon_url,
-        "usertype": usertype,
-        "domain": "https://www.ajoneedienen.com",
-        "is_suspended": is_suspended,
-    }
+    """Adds no queries once the site is known: sessions are left to the views that need one
+    (see web.cart.get_cart_id), and the user is only loaded if a template shows ``usertype``.
+    """
+    ensure_site(request.META.get("HTTP_HOST", ""))
+    return {**STATIC_CONTEXT, "usertype": lazy(get_usertype, str)(request.user)}
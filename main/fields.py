@@ -0,0 +1,78 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import models
+from easy_thumbnails.fields import ThumbnailerImageField
+from PIL import Image, ImageOps, features
+
+
+def normalize_image(file, max_size=None):
+    """Re-encode an image upright, within ``max_size`` and without metadata.
+
+    Returns the new content: WebP, or JPEG where Pillow was built without a
+    WebP encoder.
+    """
+    max_size = max_size or settings.IMAGE_MAX_SIZE
+    file.seek(0)
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        if features.check("webp"):
+            image_format, extension = "WEBP", "webp"
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        else:
+            image_format, extension = "JPEG", "jpg"
+            if has_alpha:
+                background = Image.new("RGB", image.size, (255, 255, 255))
+                background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+                image = background
+            image = image.convert("RGB")
+        output = BytesIO()
+        # Nothing from the upload's info (EXIF, ICC, XMP) is passed on, so no metadata is written.
+        image.save(output, image_format, quality=settings.IMAGE_QUALITY, optimize=True)
+    name = f"{os.path.splitext(os.path.basename(file.name))[0]}.{extension}"
+    return ContentFile(output.getvalue(), name=name)
+
+
+class NormalizedImageFieldMixin:
+    """Normalizes newly uploaded images (see ``normalize_image``) before they are stored.
+
+    Dimensions are kept in ``width_field`` and ``height_field``, measured from
+    each upload as it is normalized. Stored files are never opened just to
+    re-read them when a row is loaded, refreshed or repointed; rows stored
+    before normalization get theirs from normalize_images.
+    """
+
+    def __init__(self, *args, max_size=None, **kwargs):
+        self.max_size = max_size
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        if self.max_size:
+            kwargs["max_size"] = self.max_size
+        return name, path, args, kwargs
+
+    def update_dimension_fields(self, instance, force=False, *args, **kwargs):
+        if not force or self.attname not in instance.__dict__:
+            return
+        file = getattr(instance, self.attname)
+        if not file or not file._committed:
+            super().update_dimension_fields(instance, force, *args, **kwargs)
+
+    def pre_save(self, model_instance, add):
+        file = getattr(model_instance, self.attname)
+        if file and not file._committed:
+            setattr(model_instance, self.attname, normalize_image(file, self.max_size))
+        return super().pre_save(model_instance, add)
+
+
+class NormalizedImageField(NormalizedImageFieldMixin, models.ImageField):
+    pass
+
+
+class NormalizedThumbnailerImageField(NormalizedImageFieldMixin, ThumbnailerImageField):
+    pass
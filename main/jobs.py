@@ -0,0 +1,171 @@
+import datetime
+import functools
+import importlib
+import logging
+import os
+import socket
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Job functions by name, filled in by @job as their modules are imported
+TASKS = {}
+
+
+def job(func=None, *, max_attempts=3, backoff=30):
+    """Make ``func`` a job: ``func.enqueue(*args, **kwargs)`` stores the call for a worker to run.
+
+    The call is stored once the current transaction commits. Arguments must be JSON serializable.
+    A run that raises is retried up to ``max_attempts`` runs in all, ``backoff`` seconds later, doubling each time.
+    Calling ``func`` directly still runs it in place.
+    """
+    if func is None:
+        return functools.partial(job, max_attempts=max_attempts, backoff=backoff)
+    name = f"{func.__module__}.{func.__name__}"
+
+    def enqueue(*args, **kwargs):
+        if settings.JOB_QUEUE_EAGER:
+            func(*args, **kwargs)
+            return
+        # A worker must not run it before the data it needs is committed.
+        transaction.on_commit(
+            lambda: Job.objects.create(name=name, args=list(args), kwargs=kwargs, max_attempts=max_attempts)
+        )
+
+    func.enqueue = enqueue
+    func.backoff = backoff
+    TASKS[name] = func
+    return func
+
+
+def get_task(name):
+    if name not in TASKS:
+        importlib.import_module(name.rsplit(".", 1)[0])
+    return TASKS[name]
+
+
+def claim(worker):
+    """Take the next due job for ``worker`` and return it, or None when nothing is due.
+
+    Jobs whose worker has held them for longer than ``settings.JOB_TIMEOUT`` are
+    taken over, so a worker that died mid-job does not lose it, unless that was
+    their last attempt; those are marked failed instead.
+    """
+    now = timezone.now()
+    stale = Q(status="running", locked_at__lt=now - datetime.timedelta(seconds=settings.JOB_TIMEOUT))
+    Job.objects.filter(stale, attempts__gte=F("max_attempts")).update(
+        status="failed", last_error=f"Timed out after {settings.JOB_TIMEOUT}s"
+    )
+    due = Q(status="queued", run_at__lte=now) | (stale & Q(attempts__lt=F("max_attempts")))
+    jobs = Job.objects.filter(due).order_by("run_at")
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = jobs.select_for_update(skip_locked=True).first()
+            if job is not None:
+                job.status, job.locked_by, job.locked_at, job.attempts = "running", worker, now, job.attempts + 1
+                job.save(update_fields=["status", "locked_by", "locked_at", "attempts"])
+            return job
+
+    # Without SKIP LOCKED (SQLite), a conditional update decides which worker gets a job.
+    for pk in jobs.values_list("pk", flat=True)[:10]:
+        claimed = Job.objects.filter(due, pk=pk).update(
+            status="running", locked_by=worker, locked_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def run(job):
+    """Run a claimed job; returns True if it succeeded."""
+    started = time.monotonic()
+    try:
+        func = get_task(job.name)
+        func(*job.args, **job.kwargs)
+    except Exception:
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            backoff = getattr(TASKS.get(job.name), "backoff", 30)
+            job.status = "queued"
+            job.run_at = timezone.now() + datetime.timedelta(seconds=backoff * 2 ** (job.attempts - 1))
+        else:
+            job.status = "failed"
+        job.save(update_fields=["status", "run_at", "last_error"])
+        logger.warning("Job %s %s failed, attempt %d of %d", job.pk, job.name, job.attempts, job.max_attempts)
+        return False
+    job.delete()
+    logger.info("Job %s %s done in %.2fs", job.pk, job.name, time.monotonic() - started)
+    return True
+
+
+def setup_worker():
+    if not apps.ready:
+        django.setup()
+
+
+def process_pool(workers):
+    """Return a ProcessPoolExecutor of ``workers`` processes, each with Django set up."""
+    # Workers open their own database connections; forked ones must not share ours.
+    connections.close_all()
+    return ProcessPoolExecutor(max_workers=workers, initializer=setup_worker)
+
+
+def work(worker=None, burst=False, poll_interval=1.0):
+    """Run due jobs until stopped, or with ``burst`` until none is due. Returns the number of jobs run."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    count = 0
+    while True:
+        job = claim(worker)
+        if job is None:
+            if burst:
+                return count
+            time.sleep(poll_interval)
+            continue
+        run(job)
+        count += 1
+
+
+@job(max_attempts=5, backoff=60)
+def send_email(message):
+    email = EmailMultiAlternatives(**message, connection=get_connection(settings.JOB_EMAIL_BACKEND))
+    email.send()
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Sends mail from a worker: each message becomes a ``send_email`` job using ``settings.JOB_EMAIL_BACKEND``.
+
+    Messages with attachments are sent right away.
+    """
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            if message.attachments:
+                get_connection(settings.JOB_EMAIL_BACKEND).send_messages([message])
+                continue
+            send_email.enqueue(
+                {
+                    "subject": message.subject,
+                    "body": message.body,
+                    "from_email": message.from_email,
+                    "to": message.to,
+                    "cc": message.cc,
+                    "bcc": message.bcc,
+                    "reply_to": message.reply_to,
+                    "headers": message.extra_headers,
+                    "alternatives": [list(alternative) for alternative in getattr(message, "alternatives", [])],
+                }
+            )
+        return len(email_messages)
@@ -0,0 +1,74 @@
+import os
+from collections import defaultdict
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+from django.utils import timezone
+from main.models import Restaurant, StoredFile
+from main.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = "Collapse identical files uploaded before content-addressed storage into one stored copy each."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directories", nargs="*", default=["product_images", "category_images"])
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be collapsed.")
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            self.stderr.write("The default storage is not a ContentAddressedStorage.")
+            return
+
+        groups = defaultdict(list)
+        for directory in options["directories"]:
+            for name in self.walk(directory):
+                with default_storage.open(name) as content:
+                    groups[default_storage.get_digest(content)].append(name)
+        duplicates = {digest: names for digest, names in groups.items() if len(names) > 1}
+        wasted = sum(default_storage.size(names[0]) * (len(names) - 1) for names in duplicates.values())
+        self.stdout.write(f"{len(duplicates)} files stored more than once, {wasted / 1024 / 1024:.1f} MB to reclaim")
+        if options["dry_run"] or not duplicates:
+            return
+
+        fields = self.get_file_fields()
+        for digest, names in duplicates.items():
+            name = default_storage.get_hashed_name(digest, names[0])
+            if not default_storage.exists(name):
+                with default_storage.open(names[0]) as content:
+                    default_storage._save(name, content)
+            with transaction.atomic():
+                references = sum(self.repoint(model, field, names, name) for model, field in fields)
+                # The hashed file may already be stored and referenced by records of its own.
+                StoredFile.objects.get_or_create(name=name, defaults={"size": default_storage.size(name)})
+                default_storage.retain(name, references)
+            for old_name in names:
+                # The old copies are plain files, not stored references.
+                FileSystemStorage.delete(default_storage, old_name)
+
+        # Cached pages and fragments still point at the old names.
+        Restaurant.objects.update(menu_updated_at=timezone.now())
+        self.stdout.write(self.style.SUCCESS(f"Collapsed {sum(map(len, duplicates.values()))} files"))
+
+    def walk(self, directory):
+        directories, files = default_storage.listdir(directory)
+        for name in files:
+            yield os.path.join(directory, name)
+        for subdirectory in directories:
+            yield from self.walk(os.path.join(directory, subdirectory))
+
+    def get_file_fields(self):
+        return [
+            (model, field)
+            for model in apps.get_models()
+            for field in model._meta.concrete_fields
+            if isinstance(field, models.FileField) and field.storage is default_storage
+        ]
+
+    def repoint(self, model, field, old_names, name):
+        values = {field.attname: name}
+        if any(f.name == "updated_at" for f in model._meta.concrete_fields):
+            values["updated_at"] = timezone.now()
+        return model.objects.filter(**{f"{field.attname}__in": old_names}).update(**values)
@@ -0,0 +1,76 @@
+import os
+import time
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from main.fields import NormalizedImageFieldMixin
+from main.models import StoredFile
+from main.storage import get_stored_file_fields
+
+
+class Command(BaseCommand):
+    help = "Normalize images stored before upload normalization, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--delete-originals", action="store_true", help="Delete each original once replaced.")
+
+    def handle(self, *args, **options):
+        for model in apps.get_app_config("main").get_models():
+            for field in model._meta.fields:
+                if isinstance(field, NormalizedImageFieldMixin):
+                    self.normalize_field(model, field, options["batch_size"], options["delete_originals"])
+
+    def normalize_field(self, model, field, batch_size, delete_originals):
+        # Rows without recorded dimensions have not been normalized yet.
+        pending = (
+            model.objects.exclude(**{field.attname: ""})
+            .exclude(**{f"{field.attname}__isnull": True})
+            .filter(**{f"{field.width_field}__isnull": True})
+            .order_by("pk")
+        )
+        started = time.monotonic()
+        normalized = failed = saved_bytes = 0
+        last_pk = None
+        while True:
+            batch = pending.filter(pk__gt=last_pk) if last_pk is not None else pending
+            batch = list(batch[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            for instance in batch:
+                file = getattr(instance, field.attname)
+                original_name = file.name
+                # Stored originals are released when the record saves; older plain files are not counted.
+                counted = StoredFile.objects.filter(name=original_name).exists()
+                try:
+                    original_size = file.size
+                    with file.open("rb"):
+                        # Assigned as a new upload, the field normalizes and measures it on save.
+                        setattr(instance, field.attname, ContentFile(file.read(), name=os.path.basename(original_name)))
+                    instance.save(update_fields=[field.attname, field.width_field, field.height_field])
+                except OSError as e:
+                    failed += 1
+                    self.stderr.write(f"{model.__name__} {instance.pk} {original_name}: {e}")
+                    continue
+                file = getattr(instance, field.attname)
+                if delete_originals and not counted and original_name != file.name and not self.in_use(original_name):
+                    FileSystemStorage.delete(file.storage, original_name)
+                normalized += 1
+                saved_bytes += original_size - file.size
+
+        if normalized or failed:
+            self.stdout.write(
+                f"{model.__name__}.{field.name}: {normalized} normalized, {failed} failed, "
+                f"{saved_bytes / 1024 / 1024:.1f} MB saved in {time.monotonic() - started:.1f}s"
+            )
+
+    def in_use(self, name):
+        # Cloned rows share plain files, so one is only deleted once the last row has moved off it.
+        return any(
+            model._base_manager.filter(**{field.attname: name}).exists()
+            for model in apps.get_models()
+            for field in get_stored_file_fields(model)
+        )
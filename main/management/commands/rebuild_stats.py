@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from main.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Recount the dashboard statistics of every restaurant from scratch."
+
+    def handle(self, *args, **options):
+        rows = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} stats rows"))
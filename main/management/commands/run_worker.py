@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from main.jobs import process_pool, work
+
+
+class Command(BaseCommand):
+    help = "Run jobs from the job queue (see main.jobs)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+        parser.add_argument("--burst", action="store_true", help="Exit once no job is due.")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Seconds to wait when no job is due.")
+
+    def handle(self, *args, **options):
+        if options["workers"] == 1:
+            count = work(burst=options["burst"], poll_interval=options["poll_interval"])
+        else:
+            with process_pool(options["workers"]) as executor:
+                futures = [
+                    executor.submit(work, burst=options["burst"], poll_interval=options["poll_interval"])
+                    for _ in range(options["workers"])
+                ]
+                count = sum(future.result() for future in futures)
+        self.stdout.write(self.style.SUCCESS(f"Ran {count} jobs"))
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0010_category_reference'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='is_Booknow',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='is_socialmedia',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='location_url',
+            field=models.URLField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='restaurant',
+            name='whatsapp_message',
+            field=models.CharField(blank=True, max_length=200, null=True),
+        ),
+    ]
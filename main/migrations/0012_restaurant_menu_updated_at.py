@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0011_restaurant_is_booknow_restaurant_is_socialmedia_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='menu_updated_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,155 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:24
+
+import main.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0012_restaurant_menu_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="banner",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="banner",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="cataloguead",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="cataloguead",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="checkoutad",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="checkoutad",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="product",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="productad",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="productad",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="feature_image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="feature_image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="logo_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="logo_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="videopagead",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="videopagead",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AlterField(
+            model_name="banner",
+            name="image",
+            field=main.fields.NormalizedImageField(upload_to="banners/"),
+        ),
+        migrations.AlterField(
+            model_name="cataloguead",
+            name="image",
+            field=main.fields.NormalizedImageField(upload_to="catalogue/ads/"),
+        ),
+        migrations.AlterField(
+            model_name="category",
+            name="image",
+            field=main.fields.NormalizedImageField(upload_to="category_images/"),
+        ),
+        migrations.AlterField(
+            model_name="checkoutad",
+            name="image",
+            field=main.fields.NormalizedImageField(upload_to="checkout/ads/"),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="image",
+            field=main.fields.NormalizedThumbnailerImageField(
+                upload_to="product_images/"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productad",
+            name="image",
+            field=main.fields.NormalizedImageField(upload_to="product/ads/"),
+        ),
+        migrations.AlterField(
+            model_name="restaurant",
+            name="feature_image",
+            field=main.fields.NormalizedImageField(
+                upload_to="restaurant/feature_images/"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="restaurant",
+            name="logo",
+            field=main.fields.NormalizedImageField(
+                blank=True, null=True, upload_to="restaurant_logos"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="videopagead",
+            name="image",
+            field=main.fields.NormalizedImageField(upload_to="catalogue/ads/"),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:29
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_lines(apps, schema_editor):
+    CartItem = apps.get_model("main", "CartItem")
+    duplicates = (
+        CartItem.objects.values("session_key", "restaurant", "product")
+        .annotate(lines=Count("id"), keep=Min("id"), quantity=Sum("quantity"))
+        .filter(lines__gt=1)
+    )
+    for line in duplicates:
+        rows = CartItem.objects.filter(
+            session_key=line["session_key"], restaurant=line["restaurant"], product=line["product"]
+        )
+        rows.exclude(id=line["keep"]).delete()
+        rows.filter(id=line["keep"]).update(quantity=line["quantity"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0014_storedfile"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_lines, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="cartitem",
+            constraint=models.UniqueConstraint(
+                fields=("session_key", "restaurant", "product"), name="unique_cart_line"
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0015_unique_cart_line"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="cartitem",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0016_cartitem_updated_at"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RestaurantStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("restaurant_count", models.IntegerField(default=0)),
+                ("category_count", models.IntegerField(default=0)),
+                ("subcategory_count", models.IntegerField(default=0)),
+                ("product_count", models.IntegerField(default=0)),
+                ("option_count", models.IntegerField(default=0)),
+                (
+                    "restaurant",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="stats",
+                        to="main.restaurant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Restaurant stats",
+            },
+        ),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:04
+
+import main.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0018_job"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="banner",
+            name="image",
+            field=main.fields.NormalizedImageField(
+                height_field="image_height",
+                upload_to="banners/",
+                width_field="image_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="cataloguead",
+            name="image",
+            field=main.fields.NormalizedImageField(
+                height_field="image_height",
+                upload_to="catalogue/ads/",
+                width_field="image_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="category",
+            name="image",
+            field=main.fields.NormalizedImageField(
+                height_field="image_height",
+                upload_to="category_images/",
+                width_field="image_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="checkoutad",
+            name="image",
+            field=main.fields.NormalizedImageField(
+                height_field="image_height",
+                upload_to="checkout/ads/",
+                width_field="image_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="product",
+            name="image",
+            field=main.fields.NormalizedThumbnailerImageField(
+                height_field="image_height",
+                upload_to="product_images/",
+                width_field="image_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="productad",
+            name="image",
+            field=main.fields.NormalizedImageField(
+                height_field="image_height",
+                upload_to="product/ads/",
+                width_field="image_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="restaurant",
+            name="feature_image",
+            field=main.fields.NormalizedImageField(
+                height_field="feature_image_height",
+                upload_to="restaurant/feature_images/",
+                width_field="feature_image_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="restaurant",
+            name="logo",
+            field=main.fields.NormalizedImageField(
+                blank=True,
+                height_field="logo_height",
+                null=True,
+                upload_to="restaurant_logos",
+                width_field="logo_width",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="videopagead",
+            name="image",
+            field=main.fields.NormalizedImageField(
+                height_field="image_height",
+                upload_to="catalogue/ads/",
+                width_field="image_width",
+            ),
+        ),
+    ]
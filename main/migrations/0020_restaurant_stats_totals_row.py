@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:33
+
+import django.db.models.lookups
+from django.db import migrations, models
+
+
+def drop_duplicate_totals(apps, schema_editor):
+    # Which copy is right is unknown; without any, the totals are counted afresh on first read.
+    RestaurantStats = apps.get_model("main", "RestaurantStats")
+    totals = RestaurantStats.objects.filter(restaurant=None)
+    if totals.count() > 1:
+        totals.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0019_image_dimension_fields"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_totals, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="restaurantstats",
+            constraint=models.UniqueConstraint(
+                django.db.models.lookups.IsNull(models.F("restaurant"), True),
+                condition=models.Q(("restaurant", None)),
+                name="one_restaurant_stats_totals_row",
+            ),
+        ),
+    ]
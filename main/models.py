@@ -2,11 +2,15 @@ from uuid import uuid4
 
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models.lookups import IsNull
 from django.template.defaultfilters import slugify
 from django.urls import reverse
-from easy_thumbnails.fields import ThumbnailerImageField
+from django.utils import timezone
+
+from .fields import NormalizedImageField, NormalizedThumbnailerImageField
 
 SECTION_CHOICE = (("non-ac", "non-ac"), ("ac", "ac"))
+JOB_STATUS_CHOICE = (("queued", "Queued"), ("running", "Running"), ("failed", "Failed"))
 
 
 class BaseModel(models.Model):
@@ -42,7 +46,11 @@ class Restaurant(BaseModel):
     )
     name = models.CharField(max_length=200)
     slug = models.SlugField(max_length=200, unique=True)
-    logo = models.ImageField(upload_to="restaurant_logos", blank=True, null=True)
+    logo = NormalizedImageField(
+        upload_to="restaurant_logos", blank=True, null=True, width_field="logo_width", height_field="logo_height"
+    )
+    logo_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    logo_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     district = models.ForeignKey(District, on_delete=models.CASCADE, blank=True, null=True)
     address = models.TextField()
     is_blocked = models.BooleanField(default=False)
@@ -57,9 +65,14 @@ class Restaurant(BaseModel):
     location_url = models.URLField(max_length=200, blank=True, null=True)
 
     feature_title = models.CharField(max_length=200, blank=True, null=True)
-    feature_image = models.ImageField(upload_to="restaurant/feature_images/")
+    feature_image = NormalizedImageField(
+        upload_to="restaurant/feature_images/", width_field="feature_image_width", height_field="feature_image_height"
+    )
+    feature_image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    feature_image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     feature_description = models.TextField(blank=True, null=True)
     visitor_count = models.PositiveIntegerField(default=1)
+    menu_updated_at = models.DateTimeField(blank=True, null=True, editable=False)
 
     enable_sending = models.BooleanField(default=False)
     is_Booknow = models.BooleanField(default=False)
@@ -150,7 +163,9 @@ class Category(BaseModel):
     reference = models.ForeignKey(DefaultCategory, on_delete=models.CASCADE, blank=True, null=True)
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
-    image = models.ImageField(upload_to="category_images/")
+    image = NormalizedImageField(upload_to="category_images/", width_field="image_width", height_field="image_height")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     description = models.TextField(blank=True)
 
     def __str__(self):
@@ -169,7 +184,7 @@ class Category(BaseModel):
         return reverse("main:category_delete", kwargs={"pk": self.pk})
 
     def get_subcategories(self):
-        return Subcategory.objects.filter(category=self)
+        return self.subcategory_set.all()
 
     def get_products(self):
         return Product.objects.filter(subcategory__category=self, is_active=True)
@@ -196,7 +211,7 @@ class Subcategory(BaseModel):
 
     def get_products(self):
         return Product.objects.filter(subcategory=self)
-    
+
     def has_products(self):
         return Product.objects.filter(subcategory=self).exists()
 
@@ -205,17 +220,32 @@ class Subcategory(BaseModel):
         verbose_name_plural = "Subcategories"
 
 
+class ProductQuerySet(models.QuerySet):
+    def with_prices(self):
+        return self.annotate(
+            min_price=models.Min("option__price"),
+            ac_price=models.Min("option__price", filter=models.Q(option__section="ac")),
+            non_ac_price=models.Min("option__price", filter=models.Q(option__section="non-ac")),
+        )
+
+
 class Product(BaseModel):
     subcategory = models.ForeignKey(Subcategory, on_delete=models.CASCADE)
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
     ingredients = models.TextField(blank=True)
-    image = ThumbnailerImageField(upload_to="product_images/")
+    image = NormalizedThumbnailerImageField(
+        upload_to="product_images/", width_field="image_width", height_field="image_height"
+    )
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     is_popular = models.BooleanField(default=True)
     is_vegetarian = models.BooleanField(default=True)
     display_foodtype = models.BooleanField(default=True)
     is_active = models.BooleanField(default=True)
 
+    objects = ProductQuerySet.as_manager()
+
     def __str__(self):
         return self.name
 
@@ -233,26 +263,24 @@ class Product(BaseModel):
         return reverse("main:product_delete", kwargs={"pk": self.pk})
 
     def get_options(self):
-        return Option.objects.filter(product=self)
+        return self.option_set.all()
 
     def get_price(self):
-        return min([option.price for option in self.get_options()])
+        if hasattr(self, "min_price"):
+            return self.min_price
+        return min([option.price for option in self.get_options()], default=None)
 
     def get_ac_price(self):
+        if hasattr(self, "ac_price"):
+            return self.ac_price
         prices = [option.price for option in self.get_options() if option.section == "ac"]
-        if prices:
-            return min(prices)
-        else:
-            return None
-        # return min(prices) if prices else None
+        return min(prices) if prices else None
 
     def get_non_ac_price(self):
+        if hasattr(self, "non_ac_price"):
+            return self.non_ac_price
         prices = [option.price for option in self.get_options() if option.section == "non-ac"]
-        if prices:
-            return min(prices)
-        else:
-            return None
-        # return min(prices) if prices else None
+        return min(prices) if prices else None
 
 
 class Option(BaseModel):
@@ -277,14 +305,18 @@ class Option(BaseModel):
 
 class Banner(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
-    image = models.ImageField(upload_to="banners/")
+    image = NormalizedImageField(upload_to="banners/", width_field="image_width", height_field="image_height")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
 
     def __str__(self):
         return str(self.restaurant.name)
 
 
 class CatalogueAd(models.Model):
-    image = models.ImageField(upload_to="catalogue/ads/")
+    image = NormalizedImageField(upload_to="catalogue/ads/", width_field="image_width", height_field="image_height")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     display_upto = models.DateField()
     display_in = models.ManyToManyField(Restaurant, blank=True)
 
@@ -293,7 +325,9 @@ class CatalogueAd(models.Model):
 
 
 class CheckoutAd(models.Model):
-    image = models.ImageField(upload_to="checkout/ads/")
+    image = NormalizedImageField(upload_to="checkout/ads/", width_field="image_width", height_field="image_height")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     display_upto = models.DateField()
     display_in = models.ManyToManyField(Restaurant, blank=True)
 
@@ -302,7 +336,9 @@ class CheckoutAd(models.Model):
 
 
 class ProductAd(models.Model):
-    image = models.ImageField(upload_to="product/ads/")
+    image = NormalizedImageField(upload_to="product/ads/", width_field="image_width", height_field="image_height")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     display_upto = models.DateField()
     display_in = models.ManyToManyField(Restaurant, blank=True)
 
@@ -312,9 +348,12 @@ class ProductAd(models.Model):
 
 class CartItem(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
+    # The visitor's cart id (see web.cart.get_cart_id)
     session_key = models.CharField(max_length=200)
     product = models.ForeignKey(Option, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=0)
+    # Last change to the line; web's sweep_carts drops lines idle for too long
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def total_price(self):
         return self.product.price * self.quantity
@@ -322,6 +361,12 @@ class CartItem(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.quantity}"
 
+    class Meta:
+        constraints = [
+            # Also serves lookups of a visitor's cart by session_key
+            models.UniqueConstraint(fields=["session_key", "restaurant", "product"], name="unique_cart_line"),
+        ]
+
 
 class Notification(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE)
@@ -341,7 +386,9 @@ class Notification(models.Model):
 
 
 class VideoPageAd(models.Model):
-    image = models.ImageField(upload_to="catalogue/ads/")
+    image = NormalizedImageField(upload_to="catalogue/ads/", width_field="image_width", height_field="image_height")
+    image_width = models.PositiveIntegerField(blank=True, null=True, editable=False)
+    image_height = models.PositiveIntegerField(blank=True, null=True, editable=False)
     display_upto = models.DateField()
     display_in = models.ManyToManyField(Restaurant, blank=True)
 
@@ -365,3 +412,68 @@ class Feedback(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class StoredFile(models.Model):
+    """A file kept by ``main.storage.ContentAddressedStorage`` and how many uploads share it."""
+
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(default=0)
+    references = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class RestaurantStats(models.Model):
+    """Dashboard counts of a restaurant's menu, kept current by ``main.stats``.
+
+    The row without a restaurant holds the totals over all restaurants.
+    """
+
+    restaurant = models.OneToOneField(Restaurant, on_delete=models.CASCADE, blank=True, null=True, related_name="stats")
+    restaurant_count = models.IntegerField(default=0)
+    category_count = models.IntegerField(default=0)
+    subcategory_count = models.IntegerField(default=0)
+    product_count = models.IntegerField(default=0)
+    option_count = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = "Restaurant stats"
+        constraints = [
+            # NULLs never collide in a unique index, so it is over "restaurant IS NULL", which is the same on every row
+            models.UniqueConstraint(
+                IsNull(models.F("restaurant"), True),
+                condition=models.Q(restaurant=None),
+                name="one_restaurant_stats_totals_row",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stats: {self.restaurant or 'all restaurants'}"
+
+
+class Job(models.Model):
+    """A call of a ``main.jobs.job`` function, waiting for ``manage.py run_worker``.
+
+    Jobs are deleted once they succeed; failed ones are kept for inspection.
+    """
+
+    name = models.CharField(max_length=255)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=JOB_STATUS_CHOICE, default="queued")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "run_at"], name="job_due")]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
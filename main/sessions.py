@@ -0,0 +1,58 @@
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.backends import db
+from django.core import signing
+
+
+def in_cookie(session_key):
+    # Database keys are plain alphanumerics; signed values always contain the signer's ":" separator.
+    return bool(session_key) and ":" in session_key
+
+
+class SessionStore(db.SessionStore):
+    """Keeps signed-in users' sessions in the database and everyone else's in a signed cookie.
+
+    Menu visitors' carts then never add django_session rows, while a signed-in
+    session stays on the server, where logging out, a password change or the
+    admin can end it. A session moves to the database when its user signs in
+    and back to a cookie should it lose its user without being flushed.
+    """
+
+    salt = "main.sessions"
+
+    def is_signed_in(self):
+        return SESSION_KEY in self._session
+
+    def load(self):
+        if not in_cookie(self.session_key):
+            return super().load()
+        try:
+            return signing.loads(
+                self.session_key, salt=self.salt, serializer=self.serializer, max_age=self.get_session_cookie_age()
+            )
+        except signing.BadSignature:
+            self._session_key = None
+            return {}
+
+    def exists(self, session_key):
+        return not in_cookie(session_key) and super().exists(session_key)
+
+    def create(self):
+        if self.is_signed_in():
+            return super().create()
+        self._session_key = None
+        self.save()
+
+    def save(self, must_create=False):
+        if self.is_signed_in():
+            if in_cookie(self.session_key):
+                # create() gives the session a database key
+                self._session_key = None
+            return super().save(must_create)
+        if self.session_key and not in_cookie(self.session_key):
+            super().delete()
+        self._session_key = signing.dumps(self._session, salt=self.salt, serializer=self.serializer, compress=True)
+        self.modified = True
+
+    def delete(self, session_key=None):
+        if not in_cookie(session_key or self.session_key):
+            super().delete(session_key)
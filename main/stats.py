@@ -0,0 +1,208 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import Category, Option, Product, Restaurant, RestaurantStats, Subcategory
+
+# What each count counts, and the lookup from those rows to their restaurant
+COUNTS = {
+    "category_count": (Category.objects.all(), "restaurant"),
+    "subcategory_count": (Subcategory.objects.all(), "category__restaurant"),
+    "product_count": (Product.objects.filter(is_active=True), "subcategory__category__restaurant"),
+    "option_count": (Option.objects.all(), "product__subcategory__category__restaurant"),
+}
+LOOKUPS = {queryset.model: lookup for queryset, lookup in COUNTS.values()}
+
+# The field each menu row hangs from; changing it can file the row, and the menu below it, under another restaurant
+PARENTS = {Category: "restaurant_id", Subcategory: "category_id", Product: "subcategory_id", Option: "product_id"}
+
+
+def count(restaurant_id=None):
+    """Count a restaurant's menu from scratch, or every restaurant's without one."""
+    if restaurant_id is None:
+        counts = {name: queryset.count() for name, (queryset, lookup) in COUNTS.items()}
+        counts["restaurant_count"] = Restaurant.objects.count()
+        return counts
+    return {name: queryset.filter(**{lookup: restaurant_id}).count() for name, (queryset, lookup) in COUNTS.items()}
+
+
+def get_stats(restaurant=None):
+    """Return the stats of ``restaurant``, or the totals without one; a missing row is counted on first use."""
+    stats = RestaurantStats.objects.filter(restaurant=restaurant).first()
+    if stats is None:
+        stats, created = RestaurantStats.objects.get_or_create(
+            restaurant=restaurant, defaults=count(restaurant.pk if restaurant else None)
+        )
+    return stats
+
+
+def update_stats(restaurant_id, **deltas):
+    """Add ``deltas`` to the counts of a restaurant and to the totals.
+
+    Rows that do not exist yet are left alone; they are counted when first read.
+    """
+    changes = {name: F(name) + delta for name, delta in deltas.items()}
+    RestaurantStats.objects.filter(restaurant=None).update(**changes)
+    if restaurant_id:
+        RestaurantStats.objects.filter(restaurant_id=restaurant_id).update(**changes)
+
+
+def rebuild_stats():
+    """Recount every stats row from scratch, correcting any drift. Returns the number of rows written."""
+    counts = defaultdict(dict)
+    for name, (queryset, lookup) in COUNTS.items():
+        for restaurant_id, n in queryset.values_list(lookup).annotate(n=Count("pk")).order_by():
+            counts[restaurant_id][name] = n
+    rows = [RestaurantStats(restaurant_id=pk, **counts[pk]) for pk in Restaurant.objects.values_list("pk", flat=True)]
+    totals = {name: sum(row.get(name, 0) for row in counts.values()) for name in COUNTS}
+    rows.append(RestaurantStats(restaurant=None, restaurant_count=len(rows), **totals))
+    with transaction.atomic():
+        RestaurantStats.objects.all().delete()
+        RestaurantStats.objects.bulk_create(rows)
+    return len(rows)
+
+
+def get_restaurant_id(instance):
+    if isinstance(instance, Category):
+        return instance.restaurant_id
+    if isinstance(instance, Subcategory):
+        parents = Category.objects.filter(pk=instance.category_id)
+        return parents.values_list("restaurant", flat=True).first()
+    if isinstance(instance, Product):
+        parents = Subcategory.objects.filter(pk=instance.subcategory_id)
+        return parents.values_list("category__restaurant", flat=True).first()
+    parents = Product.objects.filter(pk=instance.product_id)
+    return parents.values_list("subcategory__category__restaurant", flat=True).first()
+
+
+def remember_parent(instance, *fields):
+    """Note the parent and restaurant ``instance`` is stored under before a save, with any other stored ``fields``."""
+    instance._old_parent = instance._old_restaurant_id = None
+    if instance._state.adding:
+        return ()
+    model = type(instance)
+    row = model._base_manager.filter(pk=instance.pk).values_list(PARENTS[model], LOOKUPS[model], *fields).first()
+    if row is None:
+        return ()
+    instance._old_parent, instance._old_restaurant_id, *rest = row
+    return rest
+
+
+def carried_counts(instance):
+    """Count ``instance`` and the menu rows below it."""
+    own = LOOKUPS[type(instance)]
+    counts = {}
+    for name, (queryset, lookup) in COUNTS.items():
+        if queryset.model is type(instance):
+            counts[name] = queryset.filter(pk=instance.pk).count()
+        elif lookup.endswith(f"__{own}"):
+            counts[name] = queryset.filter(**{lookup.removesuffix(f"__{own}"): instance.pk}).count()
+    return counts
+
+
+def follow_move(instance):
+    """Move the counts of ``instance`` and the menu below it if its save filed it under another restaurant."""
+    if instance._old_parent is None or getattr(instance, PARENTS[type(instance)]) == instance._old_parent:
+        return
+    old_id, new_id = instance._old_restaurant_id, get_restaurant_id(instance)
+    if old_id == new_id:
+        return
+    # The totals are unchanged, so only the two restaurants' rows are touched
+    counts = {name: n for name, n in carried_counts(instance).items() if n}
+    RestaurantStats.objects.filter(restaurant_id=old_id).update(**{name: F(name) - n for name, n in counts.items()})
+    RestaurantStats.objects.filter(restaurant_id=new_id).update(**{name: F(name) + n for name, n in counts.items()})
+
+
+@receiver(pre_save, sender=Category)
+@receiver(pre_save, sender=Subcategory)
+@receiver(pre_save, sender=Option)
+def menu_row_saving(sender, instance, raw=False, **kwargs):
+    instance._old_parent = instance._old_restaurant_id = None
+    if not raw:
+        remember_parent(instance)
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        update_stats(None, restaurant_count=1)
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_deleted(sender, instance, **kwargs):
+    # The menu below it was deleted, and counted off, first.
+    update_stats(None, restaurant_count=-1)
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        update_stats(instance.restaurant_id, category_count=1)
+    else:
+        follow_move(instance)
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    update_stats(instance.restaurant_id, category_count=-1)
+
+
+@receiver(post_save, sender=Subcategory)
+def subcategory_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        update_stats(get_restaurant_id(instance), subcategory_count=1)
+    else:
+        follow_move(instance)
+
+
+@receiver(post_delete, sender=Subcategory)
+def subcategory_deleted(sender, instance, **kwargs):
+    update_stats(get_restaurant_id(instance), subcategory_count=-1)
+
+
+@receiver(pre_save, sender=Product)
+def product_saving(sender, instance, raw=False, **kwargs):
+    # Only active products are counted, so remember whether this one was.
+    instance._was_active = False
+    instance._old_parent = instance._old_restaurant_id = None
+    if not raw:
+        instance._was_active = any(remember_parent(instance, "is_active"))
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    delta = int(instance.is_active) - int(instance._was_active)
+    if delta:
+        # Counted where it was; a move below then carries it over as it is now.
+        update_stats(instance._old_restaurant_id or get_restaurant_id(instance), product_count=delta)
+    follow_move(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        update_stats(get_restaurant_id(instance), product_count=-1)
+
+
+@receiver(post_save, sender=Option)
+def option_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        update_stats(get_restaurant_id(instance), option_count=1)
+    else:
+        follow_move(instance)
+
+
+@receiver(post_delete, sender=Option)
+def option_deleted(sender, instance, **kwargs):
+    update_stats(get_restaurant_id(instance), option_count=-1)
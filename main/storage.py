@@ -0,0 +1,131 @@
+import hashlib
+import os
+import tempfile
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, pre_save
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """File system storage that names files after the SHA-256 of their bytes.
+
+    Files live at ``<prefix>/ab/cd/abcd….<ext>``, so uploading bytes that are
+    already stored only adds a reference. ``release()`` drops a reference and
+    removes the file with the last one; the signal handlers below call it when
+    a record's file is replaced or the record is deleted. Names written before
+    this storage was used keep working as plain paths.
+    """
+
+    prefix = "files"
+
+    def get_digest(self, content):
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        return sha256.hexdigest()
+
+    def get_hashed_name(self, digest, name):
+        extension = os.path.splitext(name)[1].lower()
+        return f"{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{extension}"
+
+    def save(self, name, content, max_length=None):
+        from .models import StoredFile
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.get_hashed_name(self.get_digest(content), name)
+        if not self.exists(name):
+            self._save(name, content)
+        StoredFile.objects.get_or_create(name=name, defaults={"size": content.size})
+        self.retain(name)
+        return name
+
+    def _save(self, name, content):
+        # Identical bytes may be written concurrently; each writer replaces the file atomically.
+        full_path = self.path(name)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=directory, delete=False) as temporary:
+            for chunk in content.chunks():
+                temporary.write(chunk)
+        if self.file_permissions_mode is not None:
+            os.chmod(temporary.name, self.file_permissions_mode)
+        os.replace(temporary.name, full_path)
+        return name
+
+    def retain(self, name, count=1):
+        """Count ``count`` more records sharing a stored file, e.g. when an image is copied to another record."""
+        from .models import StoredFile
+
+        StoredFile.objects.filter(name=name).update(references=F("references") + count)
+
+    def release(self, name):
+        """Drop a reference to a stored file, removing the file with the last one."""
+        from .models import StoredFile
+
+        stored = StoredFile.objects.filter(name=name).first()
+        if stored is None:
+            # Not written by this storage, and possibly still shared between records.
+            return
+        StoredFile.objects.filter(pk=stored.pk, references__gt=0).update(references=F("references") - 1)
+        if StoredFile.objects.filter(pk=stored.pk, references=0).delete()[0]:
+            super().delete(name)
+
+    def delete(self, name):
+        # FieldFile.delete() saves the cleared record afterwards, which releases the file
+        # (see file_replaced), so the reference is not dropped here as well.
+        pass
+
+
+def get_stored_file_fields(model):
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and field.storage is default_storage
+    ]
+
+
+def release_on_commit(name):
+    # Files are removed from disk, which a rolled back transaction would not undo.
+    transaction.on_commit(lambda: default_storage.release(name))
+
+
+def file_replaced(sender, instance, raw=False, update_fields=None, **kwargs):
+    fields = [
+        field
+        for field in get_stored_file_fields(sender)
+        if update_fields is None or field.name in update_fields or field.attname in update_fields
+    ]
+    if raw or instance._state.adding or not fields:
+        return
+    stored = sender._base_manager.filter(pk=instance.pk).values_list(*[field.attname for field in fields]).first()
+    for field, name in zip(fields, stored or ()):
+        if name and name != getattr(instance, field.attname).name:
+            release_on_commit(name)
+
+
+def files_deleted(sender, instance, **kwargs):
+    for field in get_stored_file_fields(sender):
+        name = getattr(instance, field.attname).name
+        if name:
+            release_on_commit(name)
+
+
+def connect_signals():
+    """Release the stored files of every model's file fields when they are replaced or their record is deleted."""
+    if not isinstance(default_storage, ContentAddressedStorage):
+        return
+    for model in apps.get_models():
+        if get_stored_file_fields(model):
+            pre_save.connect(file_replaced, sender=model)
+            post_delete.connect(files_deleted, sender=model)
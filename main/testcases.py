@@ -0,0 +1,44 @@
+from io import BytesIO
+
+from django.test import TestCase, TransactionTestCase
+from PIL import Image
+
+from .models import Category, Option, Product, Restaurant, Subcategory
+
+
+def create_image(size, image_format="JPEG", **save_options):
+    output = BytesIO()
+    Image.new("RGB", size, (200, 100, 50)).save(output, image_format, **save_options)
+    return output.getvalue()
+
+
+def create_menu(restaurant, size):
+    """Give ``restaurant`` ``size`` categories of ``size`` products, each with a non-ac and an ac option."""
+    for i in range(size):
+        category = Category.objects.create(restaurant=restaurant, name=f"Category {i}", image="category_images/x.jpg")
+        subcategory = Subcategory.objects.create(category=category, name=f"Subcategory {i}")
+        for j in range(size):
+            product = Product.objects.create(
+                subcategory=subcategory, name=f"Product {i}-{j}", image="product_images/x.jpg"
+            )
+            Option.objects.create(product=product, section="non-ac", name="Full", price=100 + j)
+            Option.objects.create(product=product, section="ac", name="Full", price=120 + j)
+
+
+class RestaurantTestMixin:
+    """Creates restaurants for tests."""
+
+    def create_restaurant(self, slug="menu", size=0, **kwargs):
+        restaurant = Restaurant.objects.create(
+            name=slug, slug=slug, address="Address", phone="1", whatsapp="1", feature_image="x.jpg", **kwargs
+        )
+        create_menu(restaurant, size)
+        return restaurant
+
+
+class RestaurantTestCase(RestaurantTestMixin, TestCase):
+    pass
+
+
+class RestaurantTransactionTestCase(RestaurantTestMixin, TransactionTestCase):
+    pass
@@ -1 +1,420 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
 
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from .cloning import clone_catalogue, clone_default_catalogue
+from .context_processors import main_context
+from .jobs import claim, job, work
+from .models import (
+    Banner,
+    Category,
+    DefaultCategory,
+    DefaultProduct,
+    DefaultSubcategory,
+    DefualtproductOption,
+    Job,
+    Option,
+    Product,
+    Restaurant,
+    RestaurantStats,
+    StoredFile,
+    Subcategory,
+)
+from .stats import count, get_stats, rebuild_stats
+from .testcases import RestaurantTestCase, create_image, create_menu
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_MAX_SIZE=1000)
+class NormalizedImageFieldTest(RestaurantTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.restaurant = self.create_restaurant("menu")
+
+    def test_uploads_are_normalized(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotated 90 degrees clockwise
+        exif[0x010F] = "Camera"
+        content = create_image((3000, 2000), exif=exif.tobytes())
+        banner = Banner.objects.create(restaurant=self.restaurant, image=SimpleUploadedFile("photo.jpg", content))
+
+        self.assertTrue(banner.image.name.endswith(".webp"))
+        self.assertEqual((banner.image_width, banner.image_height), (667, 1000))
+        with Image.open(banner.image.path) as image:
+            self.assertEqual(image.size, (667, 1000))
+            self.assertFalse(image.getexif())
+
+    def test_backfill_normalizes_existing_files(self):
+        os.makedirs(f"{MEDIA_ROOT}/banners", exist_ok=True)
+        with open(f"{MEDIA_ROOT}/banners/legacy.png", "wb") as f:
+            f.write(create_image((1500, 1500), "PNG"))
+        banner = Banner.objects.create(restaurant=self.restaurant, image="banners/legacy.png")
+        self.assertIsNone(banner.image_width)
+
+        call_command("normalize_images", "--delete-originals", stdout=StringIO(), stderr=StringIO())
+        banner.refresh_from_db()
+        self.assertTrue(banner.image.name.endswith(".webp"))
+        self.assertEqual((banner.image_width, banner.image_height), (1000, 1000))
+        self.assertFalse(os.path.exists(f"{MEDIA_ROOT}/banners/legacy.png"))
+
+    def test_backfill_keeps_shared_originals_until_the_last_row(self):
+        os.makedirs(f"{MEDIA_ROOT}/banners", exist_ok=True)
+        with open(f"{MEDIA_ROOT}/banners/shared.png", "wb") as f:
+            f.write(create_image((100, 100), "PNG"))
+        for _ in range(2):
+            Banner.objects.create(restaurant=self.restaurant, image="banners/shared.png")
+
+        stdout = StringIO()
+        call_command("normalize_images", "--delete-originals", stdout=stdout, stderr=StringIO())
+        self.assertIn("2 normalized, 0 failed", stdout.getvalue())
+        self.assertFalse(Banner.objects.filter(image_width=None).exists())
+        self.assertFalse(os.path.exists(f"{MEDIA_ROOT}/banners/shared.png"))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ContentAddressedStorageTest(RestaurantTestCase):
+    def setUp(self):
+        self.restaurant = self.create_restaurant("menu")
+        self.addCleanup(shutil.rmtree, f"{MEDIA_ROOT}/category_images", ignore_errors=True)
+
+    def test_identical_uploads_are_stored_once(self):
+        content = create_image((100, 100))
+        first, second = (
+            Banner.objects.create(restaurant=self.restaurant, image=SimpleUploadedFile(name, content))
+            for name in ("a.jpg", "b.jpg")
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r"^files/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.webp$")
+        self.assertEqual(StoredFile.objects.get().references, 2)
+
+        path = second.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            first.image.delete()
+        self.assertTrue(os.path.exists(path))
+        with self.captureOnCommitCallbacks(execute=True):
+            second.image.delete()
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_replacing_or_deleting_a_record_releases_its_file(self):
+        banner = Banner.objects.create(
+            restaurant=self.restaurant, image=SimpleUploadedFile("a.jpg", create_image((10, 10)))
+        )
+        path = banner.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            banner.image = SimpleUploadedFile("b.jpg", create_image((20, 20)))
+            banner.save()
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(StoredFile.objects.get().references, 1)
+
+        path = banner.image.path
+        with self.captureOnCommitCallbacks(execute=True):
+            banner.delete()
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_saving_other_fields_keeps_the_file(self):
+        banner = Banner.objects.create(
+            restaurant=self.restaurant, image=SimpleUploadedFile("a.jpg", create_image((10, 10)))
+        )
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            banner.save()
+        self.assertEqual(callbacks, [])
+        self.assertEqual(StoredFile.objects.get().references, 1)
+
+    def test_dedupe_collapses_existing_copies(self):
+        os.makedirs(f"{MEDIA_ROOT}/category_images", exist_ok=True)
+        for name in ("one.jpg", "two.jpg"):
+            with open(f"{MEDIA_ROOT}/category_images/{name}", "wb") as f:
+                f.write(create_image((10, 10)))
+        categories = [
+            Category.objects.create(restaurant=self.restaurant, name=name, image=f"category_images/{name}")
+            for name in ("one.jpg", "two.jpg")
+        ]
+
+        call_command("dedupe_media", "category_images", stdout=StringIO())
+        names = {category.image.name for category in Category.objects.filter(pk__in=[c.pk for c in categories])}
+        self.assertEqual(len(names), 1)
+        self.assertEqual(StoredFile.objects.get(name=names.pop()).references, 2)
+        self.assertEqual(os.listdir(f"{MEDIA_ROOT}/category_images"), [])
+
+    def test_dedupe_adds_to_an_already_stored_copy(self):
+        stored = Category.objects.create(
+            restaurant=self.restaurant, name="stored", image=SimpleUploadedFile("a.jpg", create_image((10, 10)))
+        )
+        with stored.image.open("rb"):
+            content = stored.image.read()
+        os.makedirs(f"{MEDIA_ROOT}/category_images", exist_ok=True)
+        for name in ("one.webp", "two.webp"):
+            with open(f"{MEDIA_ROOT}/category_images/{name}", "wb") as f:
+                f.write(content)
+            Category.objects.create(restaurant=self.restaurant, name=name, image=f"category_images/{name}")
+
+        call_command("dedupe_media", "category_images", stdout=StringIO())
+        self.assertEqual(Category.objects.filter(image=stored.image.name).count(), 3)
+        self.assertEqual(StoredFile.objects.get(name=stored.image.name).references, 3)
+
+
+class MainContextTest(TestCase):
+    def test_adds_no_queries_and_no_session(self):
+        request = RequestFactory().get("/")
+        request.session = SessionStore()
+        request.user = AnonymousUser()
+        main_context(request)
+        with self.assertNumQueries(0):
+            context = main_context(request)
+        self.assertIsNone(request.session.session_key)
+        self.assertEqual(str(context["usertype"]), "Guest")
+
+
+class RestaurantRequiredMixinTest(RestaurantTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("owner", password="secret")
+        self.restaurant = self.create_restaurant("menu", user=self.user)
+        self.client.force_login(self.user)
+
+    def test_restaurant_is_loaded_once(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse("main:restaurant_index"))
+        self.assertEqual(response.context["restaurant"], self.restaurant)
+        restaurant_queries = [query for query in context if query["sql"].startswith('SELECT "main_restaurant"')]
+        self.assertEqual(len(restaurant_queries), 1)
+
+    def test_records_of_other_restaurants_are_refused(self):
+        create_menu(self.restaurant, 1)
+        other = self.create_restaurant("other", 1)
+        views = (
+            ("category_edit", Category, "restaurant"),
+            ("subcategory_delete", Subcategory, "category__restaurant"),
+            ("option_edit", Option, "product__subcategory__category__restaurant"),
+        )
+        for name, model, path in views:
+            with self.subTest(name=name):
+                for restaurant, status_code in ((self.restaurant, 200), (other, 403)):
+                    record = model.objects.filter(**{path: restaurant}).first()
+                    response = self.client.get(reverse(f"main:{name}", kwargs={"pk": record.pk}))
+                    self.assertEqual(response.status_code, status_code)
+
+    def test_product_form_offers_own_subcategories(self):
+        create_menu(self.restaurant, 1)
+        self.create_restaurant("other", 1)
+        response = self.client.get(reverse("main:product_new"))
+        subcategories = response.context["form"].fields["subcategory"].queryset
+        self.assertQuerySetEqual(subcategories, Subcategory.objects.filter(category__restaurant=self.restaurant))
+
+    def test_blocked_restaurant_is_redirected(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(is_blocked=True)
+        response = self.client.get(reverse("main:category_list"))
+        self.assertRedirects(response, reverse("main:restaurant_blocked"), fetch_redirect_response=False)
+
+
+class StatsTest(RestaurantTestCase):
+    def assertStats(self, restaurant=None):
+        stats = get_stats(restaurant)
+        counts = count(restaurant.pk if restaurant else None)
+        self.assertEqual({name: getattr(stats, name) for name in counts}, counts)
+
+    def test_counts_follow_changes(self):
+        first = self.create_restaurant("first", 2)
+        get_stats()
+        get_stats(first)
+        second = self.create_restaurant("second", 2)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_stats(first).product_count, 4)
+        self.assertEqual(get_stats().product_count, 8)
+
+        product = Product.objects.filter(subcategory__category__restaurant=first).first()
+        product.is_active = False
+        product.save()
+        Category.objects.filter(restaurant=second).delete()
+        for restaurant in (first, second, None):
+            self.assertStats(restaurant)
+
+        first.delete()
+        self.assertStats()
+        self.assertEqual(get_stats().restaurant_count, 1)
+
+    def test_counts_follow_moves_between_restaurants(self):
+        first = self.create_restaurant("first", 2)
+        second = self.create_restaurant("second", 2)
+        for restaurant in (first, second, None):
+            get_stats(restaurant)
+        category = Category.objects.filter(restaurant=second).first()
+
+        subcategory = Subcategory.objects.filter(category__restaurant=first).first()
+        subcategory.category = category
+        subcategory.save()
+        product = Product.objects.filter(subcategory__category__restaurant=first).first()
+        product.subcategory = subcategory
+        product.is_active = False
+        product.save()
+        option = Option.objects.filter(product__subcategory__category__restaurant=second).first()
+        option.product = Product.objects.filter(subcategory__category__restaurant=first).first()
+        option.save()
+        category.restaurant = first
+        category.save()
+        option.name = "Renamed"
+        with CaptureQueriesContext(connection) as context:
+            option.save()
+        self.assertFalse([query for query in context.captured_queries if "main_restaurantstats" in query["sql"]])
+
+        for restaurant in (first, second, None):
+            self.assertStats(restaurant)
+
+    def test_one_totals_row(self):
+        get_stats()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RestaurantStats.objects.create(restaurant=None)
+        self.assertEqual(RestaurantStats.objects.filter(restaurant=None).count(), 1)
+
+    def test_rebuild(self):
+        restaurant = self.create_restaurant("menu", 1)
+        Product.objects.update(is_active=False)
+        self.assertEqual(rebuild_stats(), 2)
+        self.assertStats(restaurant)
+        self.assertStats()
+
+
+class CloningTest(RestaurantTestCase):
+    def create_defaults(self, size):
+        for i in range(size):
+            category = DefaultCategory.objects.create(name=f"Category {i}", image="category_images/x.jpg")
+            subcategory = DefaultSubcategory.objects.create(category=category, name=f"Subcategory {i}")
+            for j in range(size):
+                product = DefaultProduct.objects.create(
+                    subcategory=subcategory, name=f"Product {i}-{j}", image="product_images/x.jpg"
+                )
+                DefualtproductOption.objects.create(product=product, section="ac", name="Full", price=100 + j)
+
+    def clone(self, slug):
+        restaurant = self.create_restaurant(slug)
+        with CaptureQueriesContext(connection) as context:
+            created = clone_default_catalogue(restaurant)
+        return restaurant, created, len(context)
+
+    def test_query_count_does_not_grow_with_catalogue(self):
+        get_stats()
+        self.create_defaults(1)
+        small, created, small_queries = self.clone("small")
+        self.assertEqual(created, {"categories": 1, "subcategories": 1, "products": 1, "options": 1})
+
+        DefaultCategory.objects.all().delete()
+        self.create_defaults(5)
+        large, created, large_queries = self.clone("large")
+        self.assertEqual(created, {"categories": 5, "subcategories": 5, "products": 25, "options": 25})
+        self.assertEqual(small_queries, large_queries)
+
+        option = Option.objects.get(product__subcategory__category__restaurant=large, product__name="Product 4-3")
+        self.assertEqual((option.product.subcategory.category.name, option.price), ("Category 4", 103))
+        self.assertStatsMatch(large)
+
+    def assertStatsMatch(self, restaurant):
+        for scope in (restaurant, None):
+            stats = get_stats(scope)
+            counts = count(scope.pk if scope else None)
+            self.assertEqual({name: getattr(stats, name) for name in counts}, counts)
+
+
+class ProductPriceTest(RestaurantTestCase):
+    def test_annotated_prices_match_the_fallback(self):
+        restaurant = self.create_restaurant("menu", 1)
+        subcategory = Subcategory.objects.get()
+        non_ac = Product.objects.create(subcategory=subcategory, name="Non-AC only", image="product_images/x.jpg")
+        for price in (90, 80):
+            Option.objects.create(product=non_ac, section="non-ac", name="Full", price=price)
+        Product.objects.create(subcategory=subcategory, name="No options", image="product_images/x.jpg")
+
+        expected = {"No options": (None, None, None), "Non-AC only": (80, None, 80), "Product 0-0": (100, 120, 100)}
+        annotated = Product.objects.filter(subcategory__category__restaurant=restaurant).with_prices()
+        for products in (annotated, Product.objects.filter(subcategory__category__restaurant=restaurant)):
+            with self.subTest(annotated=products is annotated):
+                prices = {
+                    product.name: (product.get_price(), product.get_ac_price(), product.get_non_ac_price())
+                    for product in products
+                }
+                self.assertEqual(prices, expected)
+        self.assertFalse(hasattr(Product.objects.get(name="Non-AC only"), "min_price"))
+
+
+@job(max_attempts=2, backoff=0)
+def failing_job():
+    raise ValueError("Always fails")
+
+
+@override_settings(JOB_QUEUE_EAGER=False)
+class JobTest(RestaurantTestCase):
+    def test_enqueued_cloning_runs_in_worker(self):
+        DefaultCategory.objects.create(name="Category", image="category_images/x.jpg")
+        restaurant = self.create_restaurant("menu")
+        with self.captureOnCommitCallbacks(execute=True):
+            clone_catalogue.enqueue(str(restaurant.pk))
+            self.assertFalse(Job.objects.exists())
+        self.assertFalse(Category.objects.exists())
+        self.assertEqual(work(burst=True), 1)
+        self.assertEqual(Category.objects.get().restaurant, restaurant)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_QUEUE_EAGER=True)
+    def test_eager_jobs_run_in_place(self):
+        DefaultCategory.objects.create(name="Category", image="category_images/x.jpg")
+        restaurant = self.create_restaurant("menu")
+        self.assertIsNone(clone_catalogue.enqueue(str(restaurant.pk)))
+        self.assertEqual(Category.objects.get().restaurant, restaurant)
+        self.assertFalse(Job.objects.exists())
+
+    def test_failures_are_retried_then_kept(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            failing_job.enqueue()
+        with self.assertLogs("main.jobs", "WARNING") as logs:
+            self.assertEqual(work(burst=True), 2)
+        self.assertIn("attempt 2 of 2", logs.output[-1])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), ("failed", 2))
+        self.assertIn("Always fails", job.last_error)
+        self.assertIsNone(claim("worker"))
+
+    @override_settings(JOB_TIMEOUT=60)
+    def test_stale_jobs_are_taken_over_until_their_last_attempt(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            failing_job.enqueue()
+        job = claim("dead")
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=2))
+        job = claim("worker")
+        self.assertEqual((job.locked_by, job.attempts), ("worker", 2))
+
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(minutes=2))
+        self.assertIsNone(claim("other"))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), ("failed", "worker", 2))
+
+    @override_settings(
+        EMAIL_BACKEND="main.jobs.QueuedEmailBackend",
+        JOB_EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    )
+    def test_mail_is_sent_by_worker(self):
+        message = mail.EmailMultiAlternatives("Subject", "Body", "from@example.com", ["to@example.com"])
+        message.attach_alternative("<p>Body</p>", "text/html")
+        with self.captureOnCommitCallbacks(execute=True):
+            message.send()
+        self.assertEqual(len(mail.outbox), 0)
+        work(burst=True)
+        self.assertEqual(mail.outbox[0].alternatives[0][0], "<p>Body</p>")
@@ -43,9 +43,6 @@ urlpatterns = [
     path("products/<str:pk>/", views.ProductDetailView.as_view(), name="product_detail"),
     path("products/<str:pk>/edit/", views.ProductUpdateView.as_view(), name="product_edit"),
     path("products/<str:pk>/delete/", views.ProductDeleteView.as_view(), name="product_delete"),
-    path("cart/<str:pk>/add/", views.AddCartView.as_view(), name="add_to_cart"),
-    path("cart/<str:pk>/minus/", views.MinusCartView.as_view(), name="minus_to_cart"),
-    path("howitworks/<str:pk>/", views.HowItWorksView.as_view(), name="howitworks"),
     path("option/<str:product_pk>/new/", views.OptionCreateView.as_view(), name="option_new"),
     path("option/<str:pk>/delete/", views.OptionDeleteView.as_view(), name="option_delete"),
     path("option/<str:pk>/edit/", views.OptionUpdateView.as_view(), name="option_edit"),
@@ -1,33 +1,30 @@
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth.models import User
-from django.core.exceptions import PermissionDenied
 from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
-from django.utils import timezone
 from django.views import View, generic
 from django.views.decorators.http import require_POST
 from django.views.generic.edit import DeleteView, UpdateView
 from registration.views import RegistrationView
 from django.http import HttpResponse
+from .cloning import clone_catalogue
 from .forms import ProductForm, RestaurantCreateForm, RestaurantEditForm
-from .mixins import RestaurantRequiredMixin, SuperuserRequiredMixin
+from .mixins import RestaurantObjectMixin, RestaurantRequiredMixin, SuperuserRequiredMixin
 from .models import (
-    CartItem,
     Category,
     DefaultCategory,
     DefaultProduct,
     DefaultSubcategory,
-    DefualtproductOption,
     Feedback,
     Notification,
     Option,
     Product,
     Restaurant,
     Subcategory,
-    VideoPageAd,
 )
+from .stats import get_stats
 
 
 class UserRegisterView(RegistrationView):
@@ -72,10 +69,11 @@ class AdminIndexView(LoginRequiredMixin, SuperuserRequiredMixin, generic.ListVie
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["title"] = "Home"
-        context["restaurant_count"] = Restaurant.objects.all().count()
-        context["product_count"] = Product.objects.all().count()
-        context["category_count"] = Category.objects.all().count()
-        context["subcategory_count"] = Subcategory.objects.all().count()
+        stats = get_stats()
+        context["restaurant_count"] = stats.restaurant_count
+        context["product_count"] = stats.product_count
+        context["category_count"] = stats.category_count
+        context["subcategory_count"] = stats.subcategory_count
         return context
 
 
@@ -94,52 +92,14 @@ class AutoRestaurantUpdateView(LoginRequiredMixin, generic.FormView):
         return super().dispatch(request, *args, **kwargs)
 
     def get_form(self, form_class=None):
-        if Restaurant.objects.filter(user=self.request.user).exists():
-            return RestaurantEditForm(
-                self.request.POST or None,
-                self.request.FILES or None,
-                instance=Restaurant.objects.get(user=self.request.user),
-            )
-        else:
-            return RestaurantEditForm(self.request.POST or None, self.request.FILES or None)
+        restaurant = Restaurant.objects.filter(user=self.request.user).first()
+        return RestaurantEditForm(self.request.POST or None, self.request.FILES or None, instance=restaurant)
 
     def form_valid(self, form):
         data = form.save()
         data.user = self.request.user
         data.save()
-        # Create categories for the restaurant
-        # Create categories for the restaurant
-        for cat in DefaultCategory.objects.all():
-            category_instance = Category.objects.create(
-                restaurant=data, name=cat.name, image=cat.image, description=cat.description
-            )
-
-            # Create subcategories for each category
-            for subcat in DefaultSubcategory.objects.filter(category=cat):
-                subcategory_instance = Subcategory.objects.create(
-                    category=category_instance, name=subcat.name, description=subcat.description
-                )
-
-                # Create products for each subcategory
-                for product in DefaultProduct.objects.filter(subcategory=subcat):
-                    product_instance = Product.objects.create(
-                        subcategory=subcategory_instance,
-                        name=product.name,
-                        description=product.description,
-                        ingredients=product.ingredients,
-                        image=product.image,
-                        is_popular=product.is_popular,
-                        is_vegetarian=product.is_vegetarian,
-                        display_foodtype=product.display_foodtype,
-                        is_active=product.is_active,
-                    )
-
-                    # Create options for each product
-                    for option in DefualtproductOption.objects.filter(product=product):
-                        Option.objects.create(
-                            product=product_instance, section=option.section, name=option.name, price=option.price
-                        )
-
+        clone_catalogue.enqueue(str(data.pk))
         return super().form_valid(form)
 
     def form_invalid(self, form):
@@ -153,14 +113,9 @@ class RestaurantProfileView(RestaurantRequiredMixin, generic.FormView):
     success_url = reverse_lazy("main:index")
 
     def get_form(self, form_class=None):
-        if Restaurant.objects.filter(user=self.request.user).exists():
-            return RestaurantEditForm(
-                self.request.POST or None,
-                self.request.FILES or None,
-                instance=Restaurant.objects.get(user=self.request.user),
-            )
-        else:
-            return RestaurantEditForm(self.request.POST or None, self.request.FILES or None)
+        return RestaurantEditForm(
+            self.request.POST or None, self.request.FILES or None, instance=self.request.restaurant
+        )
 
     def form_valid(self, form):
         data = form.save()
@@ -179,21 +134,18 @@ class RestaurantIndexView(RestaurantRequiredMixin, generic.ListView):
     template_name = "main/restaurant_index.html"
 
     def get_queryset(self):
-        return Product.objects.filter(
-            is_active=True, subcategory__category__restaurant=Restaurant.objects.get(user=self.request.user)
-        )
+        restaurant = self.request.restaurant
+        return Product.objects.filter(is_active=True, subcategory__category__restaurant=restaurant).with_prices()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["title"] = "Home"
-        restaurant = Restaurant.objects.get(user=self.request.user)
-        category_count = Category.objects.filter(restaurant=restaurant).count()
-        subcategory_count = Subcategory.objects.filter(category__restaurant=restaurant).count()
-        product_count = Product.objects.filter(is_active=True, subcategory__category__restaurant=restaurant).count()
+        restaurant = self.request.restaurant
+        stats = get_stats(restaurant)
         context["restaurant"] = restaurant
-        context["category_count"] = category_count
-        context["subcategory_count"] = subcategory_count
-        context["product_count"] = product_count
+        context["category_count"] = stats.category_count
+        context["subcategory_count"] = stats.subcategory_count
+        context["product_count"] = stats.product_count
         return context
 
 
@@ -256,7 +208,7 @@ class CategoryListView(RestaurantRequiredMixin, generic.ListView):
         if self.request.user.is_superuser:
             return Category.objects.all()
         else:
-            restaurant = Restaurant.objects.get(user=self.request.user)
+            restaurant = self.request.restaurant
             return Category.objects.filter(restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
@@ -273,7 +225,7 @@ class CategoryDetailView(RestaurantRequiredMixin, generic.DetailView):
         if self.request.user.is_superuser:
             return Category.objects.all()
         else:
-            restaurant = Restaurant.objects.get(user=self.request.user)
+            restaurant = self.request.restaurant
             return Category.objects.filter(restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
@@ -290,34 +242,24 @@ class CategoryCreateView(RestaurantRequiredMixin, generic.CreateView):
 
     def form_valid(self, form):
         data = form.save(commit=False)
-        data.restaurant = Restaurant.objects.get(user=self.request.user)
+        data.restaurant = self.request.restaurant
         data.save()
         return super().form_valid(form)
 
 
-class CategoryUpdateView(RestaurantRequiredMixin, UpdateView):
+class CategoryUpdateView(RestaurantObjectMixin, UpdateView):
     model = Category
     template_name = "main/category_update.html"
     fields = ("name", "image", "description")
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not Category.objects.get(pk=kwargs["pk"]).restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse_lazy("main:index")
 
 
-class CategoryDeleteView(RestaurantRequiredMixin, DeleteView):
+class CategoryDeleteView(RestaurantObjectMixin, DeleteView):
     model = Category
     template_name = "main/category_delete.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not Category.objects.get(pk=kwargs["pk"]).restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse_lazy("main:index")
 
@@ -331,7 +273,7 @@ class SubcategoryListView(RestaurantRequiredMixin, generic.ListView):
         if self.request.user.is_superuser:
             return Subcategory.objects.all()
         else:
-            restaurant = Restaurant.objects.get(user=self.request.user)
+            restaurant = self.request.restaurant
             return Subcategory.objects.filter(category__restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
@@ -359,29 +301,21 @@ class SubcategoryCreateView(RestaurantRequiredMixin, generic.CreateView):
         return category.get_absolute_url()
 
 
-class SubcategoryUpdateView(RestaurantRequiredMixin, UpdateView):
+class SubcategoryUpdateView(RestaurantObjectMixin, UpdateView):
     model = Subcategory
+    restaurant_path = "category__restaurant"
     template_name = "main/subcategory_update.html"
     fields = ("name", "image", "description")
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().category.restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse_lazy("main:index")
 
 
-class SubcategoryDeleteView(RestaurantRequiredMixin, DeleteView):
+class SubcategoryDeleteView(RestaurantObjectMixin, DeleteView):
     model = Subcategory
+    restaurant_path = "category__restaurant"
     template_name = "main/subcategory_delete.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().category.restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse_lazy("main:index")
 
@@ -393,10 +327,10 @@ class ProductListView(RestaurantRequiredMixin, generic.ListView):
 
     def get_queryset(self):
         if self.request.user.is_superuser:
-            return Product.objects.all()
+            return Product.objects.with_prices()
         else:
-            restaurant = Restaurant.objects.get(user=self.request.user)
-            return Product.objects.filter(is_active=True, subcategory__category__restaurant=restaurant)
+            restaurant = self.request.restaurant
+            return Product.objects.filter(is_active=True, subcategory__category__restaurant=restaurant).with_prices()
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -412,7 +346,7 @@ class ProductDetailView(RestaurantRequiredMixin, generic.DetailView):
         if self.request.user.is_superuser:
             return Product.objects.all()
         else:
-            restaurant = Restaurant.objects.get(user=self.request.user)
+            restaurant = self.request.restaurant
             return Product.objects.filter(is_active=True, subcategory__category__restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
@@ -429,7 +363,7 @@ class ProductCreateView(RestaurantRequiredMixin, generic.CreateView):
 
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
-        form.fields["subcategory"].queryset = Subcategory.objects.filter(category__restaurant__user=self.request.user)
+        form.fields["subcategory"].queryset = Subcategory.objects.filter(category__restaurant=self.request.restaurant)
         return form
 
     def form_valid(self, form):
@@ -439,8 +373,9 @@ class ProductCreateView(RestaurantRequiredMixin, generic.CreateView):
         return response
 
 
-class ProductUpdateView(RestaurantRequiredMixin, UpdateView):
+class ProductUpdateView(RestaurantObjectMixin, UpdateView):
     model = Product
+    restaurant_path = "subcategory__category__restaurant"
     template_name = "main/product_update.html"
     fields = (
         "subcategory",
@@ -456,94 +391,29 @@ class ProductUpdateView(RestaurantRequiredMixin, UpdateView):
 
     def get_form(self, form_class=None):
         form = super().get_form(form_class)
-        form.fields["subcategory"].queryset = Subcategory.objects.filter(category__restaurant__user=self.request.user)
+        form.fields["subcategory"].queryset = Subcategory.objects.filter(category__restaurant=self.request.restaurant)
         return form
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().subcategory.category.restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse_lazy("main:index")
 
 
-class ProductDeleteView(RestaurantRequiredMixin, DeleteView):
+class ProductDeleteView(RestaurantObjectMixin, DeleteView):
     model = Product
+    restaurant_path = "subcategory__category__restaurant"
     template_name = "main/product_delete.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().subcategory.category.restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse_lazy("main:index")
 
 
-class AddCartView(View):
-    def get(self, request, *args, **kwargs):
-        session_key = request.session.session_key
-        cart_items = CartItem.objects.filter(session_key=session_key)
-        total_price = sum(item.product.price * item.quantity for item in cart_items)
-        context = {"cart_items": cart_items, "total_price": total_price}
-        return render(request, "web/includes/cart.html", context)
-
-    def post(self, request, *args, **kwargs):
-        option_pk = request.POST.get("option_pk")
-        quantity = request.POST.get("quantity")
-        session_key = request.session.session_key
-
-        cart_item, created = CartItem.objects.get_or_create(
-            session_key=session_key, product_id=option_pk, defaults={"quantity": quantity}
-        )
-
-        if not created:
-            cart_item.quantity += int(quantity)
-            cart_item.save()
-
-        return JsonResponse({"message": "Item added to cart successfully"})
-
-
-class MinusCartView(View):
-    def get(self, request, pk, *args, **kwargs):
-        try:
-            option = Option.objects.get(pk=pk)
-            session_key = request.session.session_key
-            try:
-                cart_item = CartItem.objects.get(session_key=session_key, option=option)
-                if cart_item.quantity > 1:
-                    cart_item.quantity -= 1
-                    cart_item.save()
-                else:
-                    cart_item.delete()
-
-                return JsonResponse({"message": "Product removed from cart successfully"})
-            except CartItem.DoesNotExist:
-                return JsonResponse({"message": "Product not found in cart"}, status=404)
-        except Option.DoesNotExist:
-            return JsonResponse({"message": "Product option does not exist"}, status=404)
-
-
-class HowItWorksView(generic.DetailView):
-    template_name = "web/howitworks.html"
-    context_object_name = "restaurant"
-    model = Restaurant
-
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        restaurant = self.get_object()
-        context["banners"] = VideoPageAd.objects.filter(display_upto__gte=timezone.now(), display_in__in=[restaurant])
-        return context
-
-
 class NotificationListView(RestaurantRequiredMixin, generic.ListView):
     template_name = "main/notification_list.html"
     context_object_name = "notifications"
     paginate_by = 50
 
     def get_queryset(self):
-        restaurant = Restaurant.objects.get(user=self.request.user)
+        restaurant = self.request.restaurant
         return Notification.objects.filter(restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
@@ -557,7 +427,7 @@ class NotificationDetailView(RestaurantRequiredMixin, generic.DetailView):
     paginate_by = 50
 
     def get_queryset(self):
-        restaurant = Restaurant.objects.get(user=self.request.user)
+        restaurant = self.request.restaurant
         return Notification.objects.filter(restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
@@ -574,24 +444,19 @@ class NotificationCreateView(RestaurantRequiredMixin, generic.CreateView):
 
     def form_valid(self, form):
         data = form.save(commit=False)
-        data.restaurant = Restaurant.objects.get(user=self.request.user)
+        data.restaurant = self.request.restaurant
         data.save()
         return super().form_valid(form)
 
 
-class NotificationUpdateView(RestaurantRequiredMixin, UpdateView):
+class NotificationUpdateView(RestaurantObjectMixin, UpdateView):
     model = Notification
     template_name = "main/notification_update.html"
     fields = ("notification",)
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def form_valid(self, form):
         data = form.save(commit=False)
-        data.restaurant = Restaurant.objects.get(user=self.request.user)
+        data.restaurant = self.request.restaurant
         data.save()
         return super().form_valid(form)
 
@@ -599,30 +464,21 @@ class NotificationUpdateView(RestaurantRequiredMixin, UpdateView):
         return reverse_lazy("main:index")
 
 
-class NotificationDeleteView(RestaurantRequiredMixin, DeleteView):
+class NotificationDeleteView(RestaurantObjectMixin, DeleteView):
     model = Notification
     template_name = "main/notification_delete.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
         return reverse_lazy("main:index")
 
 
-class OptionDeleteView(RestaurantRequiredMixin, DeleteView):
+class OptionDeleteView(RestaurantObjectMixin, DeleteView):
     model = Option
+    restaurant_path = "product__subcategory__category__restaurant"
     template_name = "main/option_delete.html"
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().product.subcategory.category.restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
-        return reverse_lazy("main:product_detail", kwargs={"pk": self.get_object().product.pk})
+        return reverse_lazy("main:product_detail", kwargs={"pk": self.object.product_id})
 
 
 class OptionCreateView(RestaurantRequiredMixin, generic.CreateView):
@@ -643,18 +499,14 @@ class OptionCreateView(RestaurantRequiredMixin, generic.CreateView):
         return super().form_valid(form)
 
 
-class OptionUpdateView(RestaurantRequiredMixin, UpdateView):
+class OptionUpdateView(RestaurantObjectMixin, UpdateView):
     model = Option
+    restaurant_path = "product__subcategory__category__restaurant"
     template_name = "main/option_update.html"
     fields = ("name", "section", "price")
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.request.user.is_superuser and not self.get_object().product.subcategory.category.restaurant.user == request.user:
-            raise PermissionDenied()
-        return super().dispatch(request, *args, **kwargs)
-
     def get_success_url(self):
-        return reverse_lazy("main:product_detail", kwargs={"pk": self.get_object().product.pk})
+        return reverse_lazy("main:product_detail", kwargs={"pk": self.object.product_id})
 
 
 class FeedbackView(RestaurantRequiredMixin, generic.ListView):
@@ -662,7 +514,7 @@ class FeedbackView(RestaurantRequiredMixin, generic.ListView):
     context_object_name = "feedbacks"
 
     def get_queryset(self):
-        restaurant = Restaurant.objects.get(user=self.request.user)
+        restaurant = self.request.restaurant
         return Feedback.objects.filter(restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
@@ -738,7 +590,7 @@ class MyCategoryListView(RestaurantRequiredMixin, generic.ListView):
     paginate_by = 100
 
     def get_queryset(self):
-        restaurant = Restaurant.objects.get(user=self.request.user)
+        restaurant = self.request.restaurant
         return Category.objects.filter(restaurant=restaurant)
 
     def get_context_data(self, **kwargs):
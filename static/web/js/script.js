@@ -75,6 +75,89 @@
     $(window).on('load', function () {
         $('.modal.fade').appendTo('body');
     })
-    
+
+    // product modals are fetched from web:product_detail the first time they are opened
+    $(document).on('click', '.product_detail', function () {
+        var modal = document.getElementById($(this).data('product'));
+        if (modal) {
+            bootstrap.Modal.getOrCreateInstance(modal).show();
+            return;
+        }
+        $.get($(this).data('url'), function (html) {
+            var modal = $($.parseHTML(html)).filter('.modal').appendTo('body')[0];
+            bootstrap.Modal.getOrCreateInstance(modal).show();
+        });
+    });
+
+    // +/- taps change the quantity on screen at once and are posted to web:cart_update
+    // in batches, so rapid taps become one request. The response refreshes every copy of
+    // the changed quantities and the #cartMenu panel.
+    window.initCart = function (url, csrfToken) {
+        var pending = {};
+        var timer = null;
+        var sending = false;
+
+        function inputs(option) {
+            return $('.btn_increase[data-option="' + option + '"]').siblings('input');
+        }
+
+        function send() {
+            timer = null;
+            if (sending || $.isEmptyObject(pending)) {
+                return;
+            }
+            var changes = pending;
+            pending = {};
+            sending = true;
+            $.ajax({
+                url: url,
+                method: 'POST',
+                contentType: 'application/json',
+                headers: { 'X-CSRFToken': csrfToken },
+                data: JSON.stringify({ changes: changes }),
+                dataType: 'json',
+            }).done(function (data) {
+                // taps made while this request was out are still to be sent; keep showing them
+                $.each(data.quantities, function (option, quantity) {
+                    if (!(option in pending)) {
+                        inputs(option).val(quantity);
+                    }
+                });
+                if ($.isEmptyObject(pending)) {
+                    $('#cartMenu').html(data.html);
+                }
+            }).fail(function (xhr, status, error) {
+                console.log("AJAX request failed:", status, error);
+                // none of the batch was applied; take its taps back off the screen
+                $.each(changes, function (option, delta) {
+                    var input = inputs(option);
+                    input.val(Math.max((parseInt(input.val()) || 0) - delta, 0));
+                });
+            }).always(function () {
+                sending = false;
+                send();
+            });
+        }
+
+        function tap(button, delta) {
+            var option = String($(button).data('option'));
+            var qty = parseInt($(button).siblings('input').val()) || 0;
+            if (qty + delta < 0) {
+                return;
+            }
+            inputs(option).val(qty + delta);
+            pending[option] = (pending[option] || 0) + delta;
+            clearTimeout(timer);
+            timer = setTimeout(send, 300);
+        }
+
+        $(document).on('click', '.btn_decrease', function () {
+            tap(this, -1);
+        });
+        $(document).on('click', '.btn_increase', function () {
+            tap(this, 1);
+        });
+    };
+
 })(jQuery);
 
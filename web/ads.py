@@ -0,0 +1,50 @@
+import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Value
+from django.utils import timezone
+from main.models import CatalogueAd, CheckoutAd, ProductAd, VideoPageAd
+
+PLACEMENTS = {"catalogue": CatalogueAd, "checkout": CheckoutAd, "product": ProductAd, "video": VideoPageAd}
+
+
+def get_active_ads(restaurant):
+    """Return the ads running in ``restaurant`` as lists keyed by placement (see ``PLACEMENTS``).
+
+    All four ad tables are read in one query. The result is cached until the
+    first of them runs out, or until the restaurant's menu version changes,
+    which web.signals bumps whenever an ad or the restaurants it shows in
+    change.
+    """
+    version = restaurant.menu_updated_at.timestamp() if restaurant.menu_updated_at else 0
+    key = f"ads:{restaurant.pk}:{version}"
+    ads = cache.get(key)
+    if ads is None:
+        ads, timeout = load_active_ads(restaurant)
+        cache.set(key, ads, timeout)
+    return ads
+
+
+def load_active_ads(restaurant):
+    today = timezone.localdate()
+    queries = [
+        model.objects.filter(display_upto__gte=today, display_in=restaurant)
+        .annotate(placement=Value(placement, output_field=CharField()))
+        .values_list("placement", "pk", "image", "display_upto")
+        for placement, model in PLACEMENTS.items()
+    ]
+    rows = sorted(queries[0].union(*queries[1:], all=True))
+
+    ads = {placement: [] for placement in PLACEMENTS}
+    for placement, pk, image, display_upto in rows:
+        ads[placement].append(PLACEMENTS[placement](pk=pk, image=image, display_upto=display_upto))
+
+    timeout = settings.PAGE_CACHE_TIMEOUT
+    if rows:
+        # An ad runs through its display_upto day.
+        expires = datetime.datetime.combine(
+            min(row[3] for row in rows) + datetime.timedelta(days=1), datetime.time(), timezone.get_current_timezone()
+        )
+        timeout = max(1, min(timeout, int((expires - timezone.now()).total_seconds())))
+    return ads, timeout
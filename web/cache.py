@@ -0,0 +1,124 @@
+import hashlib
+import re
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.template.loader import get_template
+from django.utils import timezone
+from main.models import Restaurant
+
+from .cart import get_cart_store
+from .images import thumbnail_misses
+from .visitors import get_visitor_count
+
+# Rendered into cached pages in place of the visitor's CSRF token and the restaurant's visitor count,
+# and swapped back on every response.
+CSRF_PLACEHOLDER = "csrftokenplaceholder"
+VISITOR_COUNT_PLACEHOLDER = "visitorcountplaceholder"
+
+QUANTITY_PLACEHOLDER = re.compile(r"cartqty:([0-9a-f-]+):")
+
+
+def bump_menu_version(*restaurant_ids):
+    """Invalidate every cached page of the given restaurants."""
+    restaurant_ids = {pk for pk in restaurant_ids if pk}
+    if restaurant_ids:
+        Restaurant.objects.filter(pk__in=restaurant_ids).update(menu_updated_at=timezone.now())
+
+
+def get_page_cache_key(request, view_name, restaurant):
+    version = restaurant.menu_updated_at.timestamp() if restaurant.menu_updated_at else 0
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    # Ads expire by date, so a page never outlives the day it was rendered on.
+    return f"page:{view_name}:{restaurant.pk}:{version}:{timezone.localdate()}:{path}"
+
+
+class MenuPageCacheMixin:
+    """Serve public menu pages from cache until the restaurant's menu version changes.
+
+    Views set ``self.cart_quantities`` for free; visitors with something in
+    their cart get a fresh render because the page shows their quantities.
+    """
+
+    page_cached = False
+
+    def get_restaurant(self):
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        restaurant = self.get_restaurant()
+        self.page_viewed(restaurant)
+        self.cart_quantities = get_cart_store().get_quantities(request, restaurant)
+        if self.cart_quantities:
+            return super().get(request, *args, **kwargs)
+
+        # Read before rendering, which may set the placeholder on the restaurant
+        visitor_count = get_visitor_count(restaurant)
+        key = get_page_cache_key(request, type(self).__name__, restaurant)
+        content = caches["pages"].get(key)
+        if content is None:
+            self.page_cached = True
+            with thumbnail_misses() as misses:
+                response = super().get(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                content = response.render().content.decode()
+            if not misses:
+                caches["pages"].set(key, content, settings.PAGE_CACHE_TIMEOUT)
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request))
+        return HttpResponse(content.replace(VISITOR_COUNT_PLACEHOLDER, str(visitor_count)))
+
+    def get_object(self, queryset=None):
+        # get_restaurant() has fetched it already, and DetailView.get() asks again on a cache miss
+        if queryset is not None or not hasattr(self, "object"):
+            self.object = super().get_object(queryset)
+        return self.object
+
+    def page_viewed(self, restaurant):
+        pass
+
+    def get_visitor_count(self, restaurant):
+        """The visitor count to render; pages rendered for the cache get a placeholder filled in per response."""
+        if self.page_cached:
+            return VISITOR_COUNT_PLACEHOLDER
+        return get_visitor_count(restaurant)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["cart_quantities"] = self.cart_quantities
+        if self.page_cached:
+            context["csrf_token"] = CSRF_PLACEHOLDER
+        return context
+
+
+class QuantityPlaceholders:
+    """Stands in for ``cart_quantities`` while rendering a fragment shared by every visitor."""
+
+    def get(self, pk, default=0):
+        return f"cartqty:{pk}:"
+
+
+def get_product_fragment_key(template_name, product, product_ads=None):
+    parts = [f"{option.pk}:{option.updated_at.timestamp()}" for option in product.get_options()]
+    parts += [f"{ad.pk}:{ad.image.name}" for ad in product_ads or ()]
+    version = hashlib.md5(",".join([template_name, *parts]).encode()).hexdigest()
+    return f"product:{product.pk}:{product.updated_at.timestamp()}:{version}"
+
+
+def render_product_fragment(template_name, product, product_ads=None, cart_quantities=None):
+    """Render a product template from cache, filling in the visitor's cart quantities.
+
+    A render missing thumbnails is not cached (see web.images.thumbnail_misses).
+    """
+    key = get_product_fragment_key(template_name, product, product_ads)
+    html = caches["fragments"].get(key)
+    if html is None:
+        context = {"product": product, "product_ads": product_ads, "cart_quantities": QuantityPlaceholders()}
+        with thumbnail_misses() as misses:
+            html = get_template(template_name).render(context)
+        if not misses:
+            caches["fragments"].set(key, html, settings.PAGE_CACHE_TIMEOUT)
+    quantities = {str(pk): quantity for pk, quantity in (cart_quantities or {}).items()}
+    return QUANTITY_PLACEHOLDER.sub(lambda match: str(quantities.get(match.group(1), 0)), html)
@@ -0,0 +1,232 @@
+import copy
+import datetime
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum, Window
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from main.models import CartItem, Option
+
+LINE_TOTAL = ExpressionWrapper(F("quantity") * F("product__price"), output_field=DecimalField())
+
+
+def get_quantities(restaurant, cart_id):
+    """Return the visitor's cart for ``restaurant`` as an option pk -> quantity map, in one query."""
+    if not cart_id:
+        return {}
+    items = CartItem.objects.filter(restaurant=restaurant, session_key=cart_id)
+    return dict(items.values_list("product_id", "quantity"))
+
+
+def sweep_carts(ttl=None, batch_size=1000):
+    """Delete cart lines idle for ``ttl`` seconds, ``settings.CART_TTL`` by default.
+
+    Lines go in primary-key batches, each its own short DELETE. Returns the number deleted.
+    """
+    cutoff = timezone.now() - datetime.timedelta(seconds=settings.CART_TTL if ttl is None else ttl)
+    lines = CartItem.objects.filter(updated_at__lt=cutoff).order_by("pk")
+    deleted = 0
+    last_pk = 0
+    while True:
+        batch = list(lines.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size])
+        if not batch:
+            return deleted
+        last_pk = batch[-1]
+        # A line tapped since the batch was read is no longer idle and stays.
+        deleted += lines.filter(pk__in=batch).delete()[0]
+
+
+def get_cart_id(request, create=False):
+    """Return the id of the visitor's cart, kept in their session.
+
+    The id is only given out on the first cart change (``create``), so browsing
+    the menu never starts a session.
+    """
+    cart_id = request.session.get("cart_id")
+    if cart_id is None and create:
+        cart_id = request.session["cart_id"] = uuid.uuid4().hex
+    return cart_id
+
+
+def change_quantity(restaurant_id, cart_id, option_id, delta):
+    """Add ``delta`` to one cart line atomically and return its new quantity.
+
+    A line is created by its first increment and deleted when it reaches zero.
+    Concurrent changes to the same line never lose an update.
+    """
+    opts = CartItem._meta
+    table = connection.ops.quote_name(opts.db_table)
+    columns = [
+        connection.ops.quote_name(opts.get_field(name).column) for name in ("session_key", "restaurant", "product")
+    ]
+    quantity = connection.ops.quote_name(opts.get_field("quantity").column)
+    updated_at = connection.ops.quote_name(opts.get_field("updated_at").column)
+    now = opts.get_field("updated_at").get_db_prep_value(timezone.now(), connection)
+    key = " AND ".join(f"{column} = %s" for column in columns)
+    params = [
+        cart_id,
+        opts.get_field("restaurant").target_field.get_db_prep_value(restaurant_id, connection),
+        opts.get_field("product").target_field.get_db_prep_value(option_id, connection),
+    ]
+    with transaction.atomic(), connection.cursor() as cursor:
+        if delta > 0:
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}, {quantity}, {updated_at}) VALUES (%s, %s, %s, %s, %s) "
+                f"ON CONFLICT ({', '.join(columns)}) DO UPDATE SET {quantity} = {table}.{quantity} + EXCLUDED.{quantity}, "
+                f"{updated_at} = EXCLUDED.{updated_at} RETURNING {quantity}",
+                [*params, delta, now],
+            )
+            return cursor.fetchone()[0]
+        while True:
+            cursor.execute(
+                f"UPDATE {table} SET {quantity} = {quantity} + %s, {updated_at} = %s "
+                f"WHERE {key} AND {quantity} > %s RETURNING {quantity}",
+                [delta, now, *params, -delta],
+            )
+            row = cursor.fetchone()
+            if row:
+                return row[0]
+            cursor.execute(f"DELETE FROM {table} WHERE {key} AND {quantity} <= %s", [*params, -delta])
+            if cursor.rowcount:
+                return 0
+            # Either there is no line, or an increment landed in between; then the update is tried again.
+            cursor.execute(f"SELECT 1 FROM {table} WHERE {key}", params)
+            if cursor.fetchone() is None:
+                return 0
+
+
+def to_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        raise ValidationError("Invalid id")
+
+
+class CartStore:
+    """Where visitors' carts are kept; ``settings.CART_STORE`` picks the implementation.
+
+    A cart belongs to one visitor and one restaurant and maps option pks to quantities.
+    Changes are checked here, so every implementation only has to apply them.
+    """
+
+    # Largest change one tap, or one batch of taps on a line, may make
+    max_delta = 99
+
+    def get_quantities(self, request, restaurant):
+        """Return the visitor's cart for ``restaurant`` as an option pk -> quantity map."""
+        raise NotImplementedError
+
+    def change_quantity(self, request, restaurant_id, option_id, delta):
+        """Add ``delta`` to one cart line and return its new quantity; lines reaching zero are dropped.
+
+        Malformed ids, deltas beyond ``max_delta`` either way and additions of an
+        option another restaurant sells raise ValidationError.
+        """
+        if abs(delta) > self.max_delta:
+            raise ValidationError("Quantity change too large")
+        restaurant_id, option_id = to_uuid(restaurant_id), to_uuid(option_id)
+        options = Option.objects.filter(pk=option_id, product__subcategory__category__restaurant=restaurant_id)
+        if delta > 0 and not options.exists():
+            raise ValidationError("Unknown option")
+        return self.apply_change(request, restaurant_id, option_id, delta)
+
+    def apply_change(self, request, restaurant_id, option_id, delta):
+        """Add a checked ``delta`` to one cart line and return its new quantity."""
+        raise NotImplementedError
+
+    def change_quantities(self, request, restaurant_id, changes):
+        """Apply an option pk -> delta map of changes, all or none, and return the new quantities by option pk."""
+        with transaction.atomic():
+            return {
+                str(option_id): self.change_quantity(request, restaurant_id, option_id, delta)
+                for option_id, delta in changes.items()
+            }
+
+    def get_summary(self, request, restaurant):
+        """Return the visitor's cart lines for ``restaurant`` and their total.
+
+        Lines are CartItems with ``product`` (the option) and its product loaded
+        and their price annotated as ``line_total``.
+        """
+        raise NotImplementedError
+
+
+class DatabaseCartStore(CartStore):
+    """Keeps carts as CartItem rows keyed by the visitor's cart id."""
+
+    def get_quantities(self, request, restaurant):
+        return get_quantities(restaurant, get_cart_id(request))
+
+    def apply_change(self, request, restaurant_id, option_id, delta):
+        return change_quantity(restaurant_id, get_cart_id(request, create=True), option_id, delta)
+
+    def get_summary(self, request, restaurant):
+        """Read the lines and the total in one query."""
+        cart_id = get_cart_id(request)
+        if not cart_id:
+            return [], 0
+        items = list(
+            CartItem.objects.filter(restaurant=restaurant, session_key=cart_id)
+            .select_related("product__product")
+            .annotate(line_total=LINE_TOTAL, cart_total=Window(Sum(LINE_TOTAL)))
+            .order_by("pk")
+        )
+        return items, items[0].cart_total if items else 0
+
+
+class SessionCartStore(CartStore):
+    """Keeps carts in the visitor's session, so cart taps never write to the SQL database.
+
+    Pair it with a SESSION_ENGINE that keeps anonymous sessions out of the database,
+    such as main.sessions or a cache. Two requests from one visitor that overlap
+    can overwrite each other's change.
+    """
+
+    session_key = "cart"
+
+    def get_cart(self, request, restaurant_id):
+        return request.session.get(self.session_key, {}).get(str(restaurant_id), {})
+
+    def get_quantities(self, request, restaurant):
+        return {uuid.UUID(pk): quantity for pk, quantity in self.get_cart(request, restaurant.pk).items()}
+
+    def apply_change(self, request, restaurant_id, option_id, delta):
+        restaurant_id, option_id = str(restaurant_id), str(option_id)
+        carts = request.session.get(self.session_key, {})
+        cart = carts.setdefault(restaurant_id, {})
+        quantity = max(cart.get(option_id, 0) + delta, 0)
+        if quantity:
+            cart[option_id] = quantity
+        else:
+            cart.pop(option_id, None)
+        if not cart:
+            del carts[restaurant_id]
+        request.session[self.session_key] = carts
+        return quantity
+
+    def change_quantities(self, request, restaurant_id, changes):
+        carts = copy.deepcopy(request.session.get(self.session_key, {}))
+        try:
+            return super().change_quantities(request, restaurant_id, changes)
+        except Exception:
+            request.session[self.session_key] = carts
+            raise
+
+    def get_summary(self, request, restaurant):
+        quantities = self.get_quantities(request, restaurant)
+        if not quantities:
+            return [], 0
+        options = Option.objects.filter(pk__in=quantities, product__subcategory__category__restaurant=restaurant)
+        items = []
+        for option in options.select_related("product").order_by("pk"):
+            item = CartItem(restaurant=restaurant, product=option, quantity=quantities[option.pk])
+            item.line_total = item.total_price()
+            items.append(item)
+        return items, sum(item.line_total for item in items)
+
+
+def get_cart_store():
+    return import_string(settings.CART_STORE)()
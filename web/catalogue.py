@@ -0,0 +1,50 @@
+from django.db.models import Prefetch
+from django.utils.functional import cached_property
+from main.models import Category, Option, Product, Subcategory
+
+
+class Catalogue:
+    """A restaurant's menu tree, loaded up front so templates never query lazily.
+
+    The whole tree (categories -> subcategories -> active products -> options)
+    costs four queries however large the menu is.
+    """
+
+    def __init__(self, restaurant):
+        self.restaurant = restaurant
+        options = Prefetch("option_set", queryset=Option.objects.all())
+        products = Prefetch(
+            "product_set",
+            queryset=Product.objects.filter(is_active=True).with_prices().prefetch_related(options),
+            to_attr="active_products",
+        )
+        subcategories = Prefetch("subcategory_set", queryset=Subcategory.objects.prefetch_related(products))
+        self.categories = list(Category.objects.filter(restaurant=restaurant).prefetch_related(subcategories))
+
+    @cached_property
+    def products(self):
+        return self._sorted(
+            product
+            for category in self.categories
+            for subcategory in category.get_subcategories()
+            for product in subcategory.active_products
+        )
+
+    @cached_property
+    def populars(self):
+        return [product for product in self.products if product.is_popular]
+
+    def get_category(self, pk):
+        for category in self.categories:
+            if str(category.pk) == str(pk):
+                return category
+        return None
+
+    def get_products(self, category):
+        return self._sorted(
+            product for subcategory in category.get_subcategories() for product in subcategory.active_products
+        )
+
+    @staticmethod
+    def _sorted(products):
+        return sorted(products, key=lambda product: product.name)
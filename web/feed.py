@@ -0,0 +1,73 @@
+import base64
+import json
+import uuid
+
+from django.db.models import Q
+from django.http import Http404
+from main.models import Product
+
+from .search import search_products
+
+
+def filter_products(restaurant, params):
+    """Active products of ``restaurant`` narrowed by the ``category``, ``subcategory`` and ``q`` params."""
+    products = (
+        Product.objects.filter(subcategory__category__restaurant=restaurant, is_active=True)
+        .with_prices()
+        .select_related("subcategory")
+        .prefetch_related("option_set")
+    )
+    for param, lookup in (("category", "subcategory__category"), ("subcategory", "subcategory")):
+        if params.get(param):
+            try:
+                products = products.filter(**{lookup: uuid.UUID(params[param])})
+            except ValueError:
+                raise Http404(f"Invalid {param}")
+    if params.get("q"):
+        products = search_products(products, params["q"])
+    return products
+
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Raise ValueError for anything encode_cursor() could not have produced."""
+    if not cursor:
+        return None
+    position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    if not isinstance(position, dict):
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def paginate_products(products, cursor, size, ranked=False):
+    """Return one page of ``products`` and the cursor of the next page, or None after the last.
+
+    Name-ordered listings page by keyset on (name, pk), so deep pages cost the
+    same as the first. Search results keep their relevance order and page by
+    offset instead.
+    """
+    position = decode_cursor(cursor) or {}
+    if ranked:
+        offset = position.get("offset", 0)
+        if not isinstance(offset, int) or offset < 0:
+            raise ValueError("Invalid cursor")
+        page = list(products[offset : offset + size + 1])
+        next_position = {"offset": offset + size}
+    else:
+        products = products.order_by("name", "pk")
+        if position:
+            try:
+                name, pk = position["name"], uuid.UUID(position["pk"])
+            except (KeyError, TypeError, AttributeError, ValueError):
+                raise ValueError("Invalid cursor")
+            if not isinstance(name, str):
+                raise ValueError("Invalid cursor")
+            products = products.filter(Q(name__gt=name) | Q(name=name, pk__gt=pk))
+        page = list(products[: size + 1])
+        next_position = {"name": page[size - 1].name, "pk": str(page[size - 1].pk)} if len(page) > size else None
+    if len(page) <= size:
+        return page, None
+    return page[:size], encode_cursor(next_position)
@@ -0,0 +1,70 @@
+import contextlib
+import contextvars
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from easy_thumbnails.alias import aliases as thumbnail_aliases
+from easy_thumbnails.exceptions import EasyThumbnailsError
+from easy_thumbnails.files import get_thumbnailer
+
+# Thumbnail aliases the public templates render for each image field, pre-generated by generate_thumbnails
+IMAGE_ALIASES = {
+    "main.Restaurant.logo": ("logo", "logo_2x"),
+    "main.Restaurant.feature_image": ("small", "medium"),
+    "main.Category.image": ("extra_small", "extra_small_2x"),
+    "main.Subcategory.image": ("extra_small", "extra_small_2x"),
+    "main.Product.image": ("card", "card_2x", "small", "medium"),
+    "main.Banner.image": ("banner_small", "banner"),
+    "main.CatalogueAd.image": ("banner_small", "banner"),
+    "main.CheckoutAd.image": ("banner_small", "banner"),
+    "main.VideoPageAd.image": ("banner_small", "banner"),
+    "main.ProductAd.image": ("small", "medium"),
+}
+
+
+# Names of the images whose thumbnails could not all be made, collected by thumbnail_misses()
+_misses = contextvars.ContextVar("thumbnail_misses", default=None)
+
+
+@contextlib.contextmanager
+def thumbnail_misses():
+    """Collect the images rendered without all their thumbnails while the block runs.
+
+    Markup holding such a fallback must not be cached, or it would outlive the fix.
+    Misses inside a nested block count for the enclosing one as well.
+    """
+    misses = []
+    token = _misses.set(misses)
+    try:
+        yield misses
+    finally:
+        _misses.reset(token)
+        if _misses.get() is not None:
+            _misses.get().extend(misses)
+
+
+def get_thumbnails(image, aliases):
+    """Return ``(url, width, height)`` of each thumbnail alias of ``image``.
+
+    Missing thumbnails are generated on first use; the result is cached so
+    rendering a known image costs no queries or storage calls. Aliases that
+    cannot be generated (a missing or broken upload) are left out, and such a
+    result is not cached, so a fixed upload is picked up on the next render.
+    """
+    key = "thumbnails:" + hashlib.md5(f"{image.name}:{','.join(aliases)}".encode()).hexdigest()
+    thumbnails = cache.get(key)
+    if thumbnails is None:
+        thumbnails = []
+        thumbnailer = get_thumbnailer(image)
+        for alias in aliases:
+            try:
+                thumbnail = thumbnailer.get_thumbnail(thumbnail_aliases.get(alias))
+                thumbnails.append((thumbnail.url, thumbnail.width, thumbnail.height))
+            except (EasyThumbnailsError, OSError):
+                continue
+        if len(thumbnails) == len(aliases):
+            cache.set(key, thumbnails, settings.PAGE_CACHE_TIMEOUT)
+        elif _misses.get() is not None:
+            _misses.get().append(image.name)
+    return thumbnails
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import as_completed
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from easy_thumbnails.alias import aliases as thumbnail_aliases
+from easy_thumbnails.exceptions import EasyThumbnailsError
+from easy_thumbnails.files import get_thumbnailer
+from main.jobs import process_pool
+from web.images import IMAGE_ALIASES
+
+
+def get_signature(aliases):
+    options = [thumbnail_aliases.get(alias) for alias in sorted(aliases)]
+    return hashlib.md5(json.dumps(options, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def generate(name, aliases, done):
+    """Generate the thumbnails of one source file; returns ``(name, state, generated, error)``."""
+    try:
+        state = {"mtime": default_storage.get_modified_time(name).timestamp(), "signature": get_signature(aliases)}
+        if state == done:
+            return name, state, None, None
+        thumbnailer = get_thumbnailer(default_storage, name)
+        generated = 0
+        for alias in aliases:
+            options = thumbnail_aliases.get(alias)
+            if not thumbnailer.get_existing_thumbnail(options):
+                thumbnailer.get_thumbnail(options)
+                generated += 1
+        return name, state, generated, None
+    except (EasyThumbnailsError, OSError) as e:
+        return name, None, 0, str(e)
+
+
+class Command(BaseCommand):
+    help = "Generate the thumbnails of every public image ahead of the first request."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(), help="Number of worker processes; 1 works in this process."
+        )
+        parser.add_argument(
+            "--state",
+            default=os.path.join(settings.MEDIA_ROOT, settings.THUMBNAIL_BASEDIR, ".generated"),
+            help="File recording finished sources, so an interrupted run picks up where it stopped.",
+        )
+        parser.add_argument("--force", action="store_true", help="Ignore the state file and check every source.")
+
+    def handle(self, *args, **options):
+        sources = self.get_sources()
+        done = {} if options["force"] else self.read_state(options["state"])
+        self.stdout.write(f"{len(sources)} source images, {len(done)} recorded in {options['state']}")
+
+        started = time.monotonic()
+        skipped = generated = failed = 0
+        os.makedirs(os.path.dirname(options["state"]), exist_ok=True)
+        with open(options["state"], "a") as state_file:
+            for name, state, count, error in self.run(sources, done, options["workers"]):
+                if error:
+                    failed += 1
+                    self.stderr.write(f"{name}: {error}")
+                    continue
+                if count is None:
+                    skipped += 1
+                    continue
+                generated += count
+                state_file.write(json.dumps({"name": name, **state}) + "\n")
+                state_file.flush()
+
+        elapsed = time.monotonic() - started
+        processed = len(sources) - skipped - failed
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{generated} thumbnails for {processed} images in {elapsed:.1f}s "
+                f"({processed / elapsed if elapsed else 0:.1f} images/s), {skipped} up to date, {failed} failed"
+            )
+        )
+
+    def run(self, sources, done, workers):
+        """Yield the result of each source as it finishes, from worker processes or, with one worker, this one."""
+        if workers == 1:
+            for name, aliases in sources.items():
+                yield generate(name, aliases, done.get(name))
+            return
+        with process_pool(workers) as executor:
+            futures = [executor.submit(generate, name, aliases, done.get(name)) for name, aliases in sources.items()]
+            for future in as_completed(futures):
+                yield future.result()
+
+    def get_sources(self):
+        """Map every stored image name to the aliases rendered for it."""
+        sources = {}
+        for path, aliases in IMAGE_ALIASES.items():
+            model_label, field = path.rsplit(".", 1)
+            names = apps.get_model(model_label).objects.exclude(**{field: ""}).exclude(**{f"{field}__isnull": True})
+            for name in names.values_list(field, flat=True).distinct():
+                sources.setdefault(name, set()).update(aliases)
+        return {name: sorted(aliases) for name, aliases in sources.items()}
+
+    def read_state(self, path):
+        done = {}
+        if os.path.exists(path):
+            with open(path) as state_file:
+                for line in state_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # The last line of an interrupted run may be cut short.
+                        continue
+                    done[entry.pop("name")] = entry
+        return done
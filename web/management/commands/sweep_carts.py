@@ -0,0 +1,20 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from web.cart import sweep_carts
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned cart lines: those idle past the TTL."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ttl", type=int, default=settings.CART_TTL, help="Seconds a line may sit untouched.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        deleted = sweep_carts(options["ttl"], options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Deleted {deleted} abandoned cart lines in {time.monotonic() - started:.1f}s")
+        )
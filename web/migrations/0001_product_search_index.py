@@ -0,0 +1,36 @@
+from django.db import migrations
+
+FTS_TABLE = "main_product_fts"
+SEARCH_VECTOR = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+SEARCH_INDEX = "main_product_search_idx"
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(product_id UNINDEXED, name, description)"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {FTS_TABLE} (product_id, name, description) SELECT id, name, description FROM main_product"
+        )
+    elif vendor == "postgresql":
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {SEARCH_INDEX} ON main_product USING GIN ({SEARCH_VECTOR})")
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {SEARCH_INDEX}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0012_restaurant_menu_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+FTS_TABLE = "main_product_fts"
+ROWID_TABLE = "main_product_fts_rowid"
+
+
+def create_rowid_table(apps, schema_editor):
+    # Product pks are UUIDs, which cannot be FTS5 rowids. Rows are found through an indexed
+    # product_id -> rowid table instead of a scan of an UNINDEXED column.
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    schema_editor.execute(
+        f"CREATE TABLE {ROWID_TABLE} (id INTEGER PRIMARY KEY AUTOINCREMENT, product_id CHAR(32) NOT NULL UNIQUE)"
+    )
+    schema_editor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, description)")
+    schema_editor.execute(f"INSERT INTO {ROWID_TABLE} (product_id) SELECT id FROM main_product")
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (rowid, name, description) "
+        f"SELECT r.id, p.name, p.description FROM {ROWID_TABLE} r JOIN main_product p ON p.id = r.product_id"
+    )
+
+
+def drop_rowid_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {ROWID_TABLE}")
+    schema_editor.execute(f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(product_id UNINDEXED, name, description)")
+    schema_editor.execute(
+        f"INSERT INTO {FTS_TABLE} (product_id, name, description) SELECT id, name, description FROM main_product"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0001_product_search_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rowid_table, drop_rowid_table),
+    ]
@@ -0,0 +1,95 @@
+import re
+
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, When
+from main.models import Product
+
+# SQLite: an FTS5 table kept in sync by web.signals, whose rowids map to products through ROWID_TABLE.
+FTS_TABLE = "main_product_fts"
+ROWID_TABLE = "main_product_fts_rowid"
+# PostgreSQL: a GIN expression index over the same document, so nothing needs syncing.
+SEARCH_VECTOR = "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))"
+SEARCH_INDEX = "main_product_search_idx"
+
+
+def get_terms(query):
+    return re.findall(r"\w+", query.lower())
+
+
+def search_products(queryset, query):
+    """Narrow a Product queryset to those matching ``query``, best matches first.
+
+    Every term is matched as a prefix of a word in the name or description.
+    Databases without a search index fall back to ``icontains``.
+    """
+    terms = get_terms(query)
+    if not terms:
+        return queryset.none()
+    if connection.vendor == "sqlite":
+        ids = _search_sqlite(queryset, terms)
+    elif connection.vendor == "postgresql":
+        ids = _search_postgresql(queryset, terms)
+    else:
+        return queryset.filter(Q(name__icontains=query) | Q(description__icontains=query))
+    ranking = Case(*[When(pk=pk, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+    return queryset.filter(pk__in=ids).order_by(ranking) if ids else queryset.none()
+
+
+def _candidates(queryset):
+    return queryset.order_by().values("pk").query.sql_with_params()
+
+
+def _search_sqlite(queryset, terms):
+    match = " ".join(f'"{term}"*' for term in terms)
+    candidates, params = _candidates(queryset)
+    sql = (
+        f"SELECT r.product_id FROM {FTS_TABLE} JOIN {ROWID_TABLE} r ON r.id = {FTS_TABLE}.rowid "
+        f"WHERE {FTS_TABLE} MATCH %s AND r.product_id IN ({candidates}) ORDER BY bm25({FTS_TABLE})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (match, *params))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_postgresql(queryset, terms):
+    tsquery = " & ".join(f"{term}:*" for term in terms)
+    candidates, params = _candidates(queryset)
+    sql = (
+        f"SELECT id FROM main_product WHERE {SEARCH_VECTOR} @@ to_tsquery('simple', %s) AND id IN ({candidates}) "
+        f"ORDER BY ts_rank({SEARCH_VECTOR}, to_tsquery('simple', %s)) DESC"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (tsquery, *params, tsquery))
+        return [row[0] for row in cursor.fetchall()]
+
+
+def index_products(products):
+    """Write products into the SQLite FTS table; a no-op elsewhere.
+
+    Each product's row is found through the rowid table's index, so a write
+    costs the same however many products are indexed.
+    """
+    if connection.vendor != "sqlite":
+        return
+    pk_field = Product._meta.pk
+    rows = [
+        (pk_field.get_db_prep_value(product.pk, connection), product.name, product.description) for product in products
+    ]
+    rowid = f"(SELECT id FROM {ROWID_TABLE} WHERE product_id = %s)"
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {ROWID_TABLE} (product_id) VALUES (%s) ON CONFLICT DO NOTHING", [row[:1] for row in rows]
+        )
+        cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = {rowid}", [row[:1] for row in rows])
+        cursor.executemany(f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES ({rowid}, %s, %s)", rows)
+
+
+def unindex_product(product):
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        pk = Product._meta.pk.get_db_prep_value(product.pk, connection)
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = (SELECT id FROM {ROWID_TABLE} WHERE product_id = %s)", [pk]
+        )
+        cursor.execute(f"DELETE FROM {ROWID_TABLE} WHERE product_id = %s", [pk])
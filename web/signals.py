@@ -0,0 +1,91 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from main.cloning import catalogue_cloned
+from main.models import (
+    Banner,
+    CatalogueAd,
+    Category,
+    CheckoutAd,
+    Notification,
+    Option,
+    Product,
+    ProductAd,
+    Restaurant,
+    Subcategory,
+    VideoPageAd,
+)
+
+from .cache import bump_menu_version
+from .search import index_products, unindex_product
+
+AD_MODELS = (CatalogueAd, CheckoutAd, ProductAd, VideoPageAd)
+
+
+def get_restaurant_id(instance):
+    if isinstance(instance, Restaurant):
+        return instance.pk
+    if isinstance(instance, (Category, Banner, Notification)):
+        return instance.restaurant_id
+    if isinstance(instance, Subcategory):
+        parents = Category.objects.filter(pk=instance.category_id).values_list("restaurant_id", flat=True)
+    elif isinstance(instance, Product):
+        parents = Subcategory.objects.filter(pk=instance.subcategory_id)
+        parents = parents.values_list("category__restaurant_id", flat=True)
+    else:
+        parents = Product.objects.filter(pk=instance.product_id)
+        parents = parents.values_list("subcategory__category__restaurant_id", flat=True)
+    return parents.first()
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Subcategory)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Option)
+@receiver(post_save, sender=Banner)
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Category)
+@receiver(post_delete, sender=Subcategory)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Option)
+@receiver(post_delete, sender=Banner)
+@receiver(post_delete, sender=Notification)
+def menu_changed(sender, instance, **kwargs):
+    bump_menu_version(get_restaurant_id(instance))
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    unindex_product(instance)
+
+
+@receiver(catalogue_cloned)
+def catalogue_cloned_into(sender, restaurant, products, **kwargs):
+    index_products(products)
+    bump_menu_version(restaurant.pk)
+
+
+def ad_changed(sender, instance, **kwargs):
+    bump_menu_version(*instance.display_in.values_list("pk", flat=True))
+
+
+def ad_restaurants_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if reverse:
+        bump_menu_version(instance.pk)
+    elif action == "pre_clear":
+        bump_menu_version(*instance.display_in.values_list("pk", flat=True))
+    else:
+        bump_menu_version(*pk_set)
+
+
+for model in AD_MODELS:
+    post_save.connect(ad_changed, sender=model)
+    pre_delete.connect(ad_changed, sender=model)
+    m2m_changed.connect(ad_restaurants_changed, sender=model.display_in.through)
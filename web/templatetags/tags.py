@@ -1,13 +1,42 @@
 from django import template
-from main.models import CartItem
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+from web.cache import render_product_fragment
+from web.images import get_thumbnails
 
 register = template.Library()
 
 
 @register.simple_tag
-def get_qty(session_key, option, restaurant):
-    if CartItem.objects.filter(session_key=session_key, product=option, restaurant=restaurant).exists():
-        item = CartItem.objects.filter(session_key=session_key, product=option, restaurant=restaurant).first()
-        return item.quantity
-    else:
+def get_qty(cart_quantities, option):
+    if not cart_quantities:
         return 0
+    return cart_quantities.get(option.pk, 0)
+
+
+@register.simple_tag
+def product_card(product):
+    return mark_safe(render_product_fragment("web/includes/product.html", product))
+
+
+@register.simple_tag
+def responsive_image(image, aliases, sizes="100vw", loading="lazy", **attrs):
+    """An <img> of ``image`` offering the comma-separated thumbnail ``aliases``, smallest first, via srcset."""
+    if not image:
+        return ""
+    thumbnails = get_thumbnails(image, aliases.split(","))
+    if not thumbnails:
+        return format_html("<img{}>", flatatt({"src": image.url, "loading": loading, **attrs}))
+    url, width, height = thumbnails[0]
+    attrs = {
+        "src": url,
+        "srcset": ", ".join(f"{url} {width}w" for url, width, height in thumbnails),
+        "sizes": sizes,
+        "width": width,
+        "height": height,
+        "loading": loading,
+        "decoding": "async",
+        **attrs,
+    }
+    return format_html("<img{}>", flatatt(attrs))
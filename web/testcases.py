@@ -0,0 +1,19 @@
+from main.testcases import RestaurantTestCase, RestaurantTransactionTestCase
+
+from .visitors import flush
+
+
+class MenuTestMixin:
+    """Writes out the visits buffered by web.visitors after each test, so none leak into the next."""
+
+    def tearDown(self):
+        flush()
+        super().tearDown()
+
+
+class MenuTestCase(MenuTestMixin, RestaurantTestCase):
+    pass
+
+
+class MenuTransactionTestCase(MenuTestMixin, RestaurantTransactionTestCase):
+    pass
@@ -1 +1,590 @@
-# Create your tests here.
+import os
+import re
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from threading import Thread
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import F
+from django.template import Context, Template
+from django.template.loader import get_template
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from easy_thumbnails.alias import aliases as thumbnail_aliases
+from main.cloning import clone_default_catalogue
+from main.models import (
+    CartItem,
+    CatalogueAd,
+    Category,
+    CheckoutAd,
+    DefaultCategory,
+    DefaultProduct,
+    DefaultSubcategory,
+    Option,
+    Product,
+    ProductAd,
+    Restaurant,
+    Subcategory,
+    VideoPageAd,
+)
+from main.testcases import create_image
+
+from .ads import PLACEMENTS, get_active_ads
+from .cache import render_product_fragment
+from .cart import change_quantity, sweep_carts
+from .catalogue import Catalogue
+from .feed import encode_cursor
+from .images import IMAGE_ALIASES
+from .search import search_products
+from .testcases import MenuTestCase, MenuTransactionTestCase
+from .visitors import flush
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def write_image(name):
+    os.makedirs(os.path.dirname(f"{MEDIA_ROOT}/{name}"), exist_ok=True)
+    with open(f"{MEDIA_ROOT}/{name}", "wb") as f:
+        f.write(create_image((1000, 800)))
+
+
+def write_menu_images():
+    """Write the images create_restaurant() names, so menu pages render with their thumbnails."""
+    for name in ("x.jpg", "category_images/x.jpg", "product_images/x.jpg"):
+        write_image(name)
+
+
+class CatalogueTest(MenuTestCase):
+    def walk(self, restaurant):
+        catalogue = Catalogue(restaurant)
+        for category in catalogue.categories:
+            for subcategory in category.get_subcategories():
+                for product in subcategory.active_products:
+                    product.subcategory.category.name
+                    for option in product.get_options():
+                        option.product.is_vegetarian
+        return catalogue
+
+    def test_query_count_does_not_grow_with_menu(self):
+        small = self.create_restaurant("small", 1)
+        large = self.create_restaurant("large", 6)
+        with self.assertNumQueries(4):
+            self.walk(small)
+        with self.assertNumQueries(4):
+            catalogue = self.walk(large)
+        self.assertEqual(len(catalogue.products), 36)
+        self.assertEqual(len(catalogue.populars), 36)
+
+    def test_inactive_products_are_excluded(self):
+        restaurant = self.create_restaurant("menu", 2)
+        Product.objects.filter(name="Product 0-0").update(is_active=False)
+        catalogue = Catalogue(restaurant)
+        category = catalogue.get_category(catalogue.categories[0].pk)
+        self.assertEqual([product.name for product in catalogue.get_products(category)], ["Product 0-1"])
+
+    def count_page_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_page_query_count_does_not_grow_with_menu(self):
+        small = self.create_restaurant("small", 1)
+        large = self.create_restaurant("large", 6)
+        pages = []
+        for restaurant in (small, large):
+            option = Option.objects.filter(product__subcategory__category__restaurant=restaurant).first()
+            self.client.get(reverse("web:cart_item_plus"), {"restaurant_pk": restaurant.pk, "option": option.pk})
+            category = Category.objects.filter(restaurant=restaurant).first()
+            pages.append((restaurant.get_web_url(), category.get_web_url()))
+
+        for small_url, large_url in zip(*pages):
+            self.assertEqual(self.count_page_queries(small_url), self.count_page_queries(large_url))
+
+
+class VisitorCountTest(MenuTestCase):
+    def test_visits_are_buffered_until_flushed(self):
+        restaurant = self.create_restaurant("menu")
+        self.client.get(restaurant.get_web_url())
+        self.client.get(reverse("web:checkout", kwargs={"pk": restaurant.pk}))
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.visitor_count, 1)
+
+        self.assertEqual(flush(), 2)
+        restaurant.refresh_from_db()
+        self.assertEqual(restaurant.visitor_count, 3)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PageCacheTest(MenuTestCase):
+    def setUp(self):
+        write_menu_images()
+
+    def test_menu_changes_invalidate_cached_page(self):
+        restaurant = self.create_restaurant("menu", 1)
+        self.client.get(restaurant.get_web_url())
+        with self.assertNumQueries(1):
+            response = self.client.get(restaurant.get_web_url())
+        self.assertContains(response, "Product 0-0")
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+        product = Product.objects.get()
+        product.name = "Renamed"
+        product.save()
+        self.assertContains(self.client.get(restaurant.get_web_url()), "Renamed")
+
+    def test_page_missing_thumbnails_is_not_cached(self):
+        restaurant = self.create_restaurant("menu", 1)
+        Product.objects.update(image="product_images/unwritten.jpg")
+        self.client.get(restaurant.get_web_url())
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(restaurant.get_web_url())
+        self.assertGreater(len(context), 1)
+
+    def test_page_render_fetches_its_object_once(self):
+        restaurant = self.create_restaurant("menu", 1)
+        category = Category.objects.get()
+        pages = [
+            (restaurant.get_web_url(), '"main_restaurant"."slug" = '),
+            (reverse("web:category_catalogue", args=[category.pk]), '"main_category"."id" = '),
+        ]
+        for url, lookup in pages:
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            self.assertEqual(len([query for query in context.captured_queries if lookup in query["sql"]]), 1)
+            self.assertEqual(response.status_code, 200)
+
+    def test_cached_page_shows_current_visitor_count(self):
+        restaurant = self.create_restaurant("menu", 1)
+        self.client.get(restaurant.get_web_url())
+        Restaurant.objects.filter(pk=restaurant.pk).update(visitor_count=40)
+        response = self.client.get(restaurant.get_web_url())
+        self.assertContains(response, "Total Visitors Count : 42")
+
+    def test_visitors_with_a_cart_get_a_fresh_page(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.filter(section="ac").get()
+        self.client.get(restaurant.get_web_url())
+        self.client.get(reverse("web:cart_item_plus"), {"option": option.pk, "restaurant_pk": restaurant.pk})
+        response = self.client.get(restaurant.get_web_url())
+        self.assertEqual(response.context["cart_quantities"], {option.pk: 1})
+
+
+class SearchTest(MenuTestCase):
+    def search(self, query):
+        return [product.name for product in search_products(Product.objects.all(), query)]
+
+    def test_index_follows_saves_and_deletes(self):
+        restaurant = self.create_restaurant("menu", 1)
+        product = Product.objects.get()
+        product.name = "Chicken Curry"
+        product.save()
+        self.assertEqual(self.search("chick cur"), ["Chicken Curry"])
+        self.assertEqual(self.search("product"), [])
+
+        product.delete()
+        self.assertEqual(self.search("chicken"), [])
+        self.create_restaurant("other", 1)
+        self.assertEqual(self.search("product"), ["Product 0-0"])
+        products = Product.objects.filter(subcategory__category__restaurant=restaurant)
+        self.assertFalse(search_products(products, "product").exists())
+
+    def test_cloned_catalogue_is_indexed(self):
+        category = DefaultCategory.objects.create(name="Category", image="category_images/x.jpg")
+        subcategory = DefaultSubcategory.objects.create(category=category, name="Subcategory")
+        DefaultProduct.objects.create(subcategory=subcategory, name="Paneer Tikka", image="product_images/x.jpg")
+        restaurant = self.create_restaurant("menu")
+        version = Restaurant.objects.get(pk=restaurant.pk).menu_updated_at
+        clone_default_catalogue(restaurant)
+        self.assertEqual(self.search("paneer"), ["Paneer Tikka"])
+        self.assertGreater(Restaurant.objects.get(pk=restaurant.pk).menu_updated_at, version)
+
+    def test_best_matches_come_first(self):
+        restaurant = self.create_restaurant("menu", 1)
+        subcategory = Subcategory.objects.get()
+        for name, description in (("Veg Biryani", "With paneer"), ("Paneer Tikka", "Grilled paneer"), ("Lassi", "")):
+            Product.objects.create(subcategory=subcategory, name=name, description=description, image="x.jpg")
+        self.assertEqual(self.search("pane"), ["Paneer Tikka", "Veg Biryani"])
+
+
+class SearchIndexMigrationTest(MenuTransactionTestCase):
+    def test_migration_indexes_existing_products(self):
+        self.create_restaurant("menu", 2)
+        call_command("migrate", "web", "zero", verbosity=0)
+        call_command("migrate", "web", verbosity=0)
+        self.assertEqual(len(search_products(Product.objects.all(), "product")), 4)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ProductFragmentCacheTest(MenuTestCase):
+    def setUp(self):
+        write_menu_images()
+
+    def test_warm_render_fills_in_each_visitors_quantities(self):
+        restaurant = self.create_restaurant("menu", 1)
+        product = Catalogue(restaurant).products[0]
+        options = {option.section: option for option in product.get_options()}
+        template_name = "web/includes/product_modal.html"
+        render_product_fragment(template_name, product)
+
+        with mock.patch("web.cache.get_template") as get_template, self.assertNumQueries(0):
+            first = render_product_fragment(template_name, product, cart_quantities={options["ac"].pk: 2})
+            second = render_product_fragment(template_name, product, cart_quantities={options["non-ac"].pk: 5})
+        get_template.assert_not_called()
+        self.assertEqual(re.findall(r'count-number-input" type="text" value="(\d+)"', first), ["2", "0"])
+        self.assertEqual(re.findall(r'count-number-input" type="text" value="(\d+)"', second), ["0", "5"])
+
+    def test_render_missing_thumbnails_is_not_cached(self):
+        restaurant = self.create_restaurant("menu", 1)
+        product = Catalogue(restaurant).products[0]
+        product.image = "product_images/fixed.jpg"
+        render_product_fragment("web/includes/product.html", product)
+        with mock.patch("web.cache.get_template", wraps=get_template) as template:
+            render_product_fragment("web/includes/product.html", product)
+            write_image("product_images/fixed.jpg")
+            html = render_product_fragment("web/includes/product.html", product)
+            render_product_fragment("web/includes/product.html", product)
+        self.assertEqual(template.call_count, 2)
+        self.assertIn("srcset", html)
+
+    def test_menu_larger_than_the_old_cache_stays_cached(self):
+        restaurant = self.create_restaurant("menu", 18)
+        products = Catalogue(restaurant).products
+        for product in products:
+            render_product_fragment("web/includes/product.html", product)
+        with mock.patch("web.cache.get_template") as get_template:
+            for product in products:
+                render_product_fragment("web/includes/product.html", product)
+        get_template.assert_not_called()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ResponsiveImageTest(MenuTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.create_restaurant("menu", 1)
+        self.product = Product.objects.get()
+
+    def render(self, name):
+        self.product.image = name
+        template = Template('{% load tags %}{% responsive_image product.image "card,card_2x" sizes="50vw" alt="x" %}')
+        return template.render(Context({"product": self.product}))
+
+    def test_thumbnails_are_offered_through_srcset(self):
+        write_image("product_images/photo.jpg")
+        card, card_2x = (
+            f"/media/thumbnails/product_images/photo.jpg.{size}_q85_crop.jpg" for size in ("400x300", "800x600")
+        )
+        self.assertHTMLEqual(
+            self.render("product_images/photo.jpg"),
+            f'<img src="{card}" srcset="{card} 400w, {card_2x} 800w" sizes="50vw" width="400" height="300" '
+            'loading="lazy" decoding="async" alt="x">',
+        )
+
+    def test_missing_upload_falls_back_until_it_exists(self):
+        html = self.render("product_images/later.jpg")
+        self.assertHTMLEqual(html, '<img src="/media/product_images/later.jpg" loading="lazy" alt="x">')
+
+        write_image("product_images/later.jpg")
+        self.assertIn('width="400"', self.render("product_images/later.jpg"))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class GenerateThumbnailsTest(MenuTestCase):
+    def setUp(self):
+        self.create_restaurant("menu", 1)
+        for name in ("x.jpg", "category_images/x.jpg", "product_images/x.jpg"):
+            os.makedirs(os.path.dirname(f"{MEDIA_ROOT}/{name}"), exist_ok=True)
+            with open(f"{MEDIA_ROOT}/{name}", "wb") as f:
+                f.write(create_image((1000, 800)))
+        self.state = f"{tempfile.mkdtemp(dir=MEDIA_ROOT)}/state"
+
+    def tearDown(self):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDown()
+
+    def generate(self, *args):
+        stdout = StringIO()
+        call_command("generate_thumbnails", "--workers=1", f"--state={self.state}", *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_generates_the_listed_aliases(self):
+        self.assertIn("8 thumbnails for 3 images", self.generate())
+        thumbnails = os.listdir(f"{MEDIA_ROOT}/thumbnails/product_images")
+        aliases = IMAGE_ALIASES["main.Product.image"]
+        self.assertEqual(len(thumbnails), len(aliases))
+        for alias in aliases:
+            width, height = thumbnail_aliases.get(alias)["size"]
+            self.assertTrue(any(f".{width}x{height}_" in thumbnail for thumbnail in thumbnails), alias)
+
+    def test_rerun_skips_recorded_sources(self):
+        self.generate()
+        output = self.generate()
+        self.assertIn("0 thumbnails for 0 images", output)
+        self.assertIn("3 up to date", output)
+
+    def test_force_ignores_the_state_file(self):
+        self.generate()
+        output = self.generate("--force")
+        self.assertIn("0 thumbnails for 3 images", output)
+        self.assertIn("0 up to date", output)
+
+
+class ProductFeedTest(MenuTestCase):
+    @override_settings(PRODUCT_FEED_PAGE_SIZE=4)
+    def test_feed_pages_through_every_product_once(self):
+        restaurant = self.create_restaurant("menu", 3)
+        response = self.client.get(reverse("web:restaurant_products", kwargs={"pk": restaurant.pk}))
+        names = [product.name for product in response.context["object_list"]]
+        cursor = response.context["next_cursor"]
+        url = reverse("web:restaurant_product_feed", kwargs={"pk": restaurant.pk})
+        while cursor:
+            data = self.client.get(url, {"cursor": cursor}).json()
+            page = list(dict.fromkeys(re.findall(r"Product \d-\d", data["html"])))
+            self.assertEqual(len(page), data["count"])
+            names += page
+            cursor = data["next_cursor"]
+        self.assertEqual(names, sorted(names))
+        self.assertEqual(len(set(names)), 9)
+
+    def test_invalid_cursor_is_rejected(self):
+        restaurant = self.create_restaurant("menu")
+        url = reverse("web:restaurant_product_feed", kwargs={"pk": restaurant.pk})
+        for position in ({"name": "a", "pk": 5}, {"name": "a", "pk": "x"}, {"name": 5, "pk": str(restaurant.pk)}, []):
+            with self.subTest(position=position):
+                self.assertEqual(self.client.get(url, {"cursor": encode_cursor(position)}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"cursor": "not-a-cursor"}).status_code, 400)
+        self.assertEqual(self.client.get("/catalogue/menu/products/feed/").status_code, 404)
+
+    def test_product_modal_is_fetched_on_demand(self):
+        restaurant = self.create_restaurant("menu", 1)
+        product = Product.objects.get()
+        option = product.get_options().get(section="ac")
+        self.assertNotContains(self.client.get(restaurant.get_web_url()), 'class="modal fade" id="%s"' % product.pk)
+
+        self.client.get(reverse("web:cart_item_plus"), {"option": option.pk, "restaurant_pk": restaurant.pk})
+        response = self.client.get(reverse("web:product_detail", kwargs={"pk": product.pk}))
+        self.assertContains(response, 'class="modal fade" id="%s"' % product.pk)
+        self.assertContains(response, 'value="1"')
+        self.assertEqual(self.client.get("/product/not-a-product/").status_code, 404)
+
+
+class ActiveAdsTest(MenuTestCase):
+    def test_ads_are_read_once_until_they_change(self):
+        restaurant = self.create_restaurant("menu")
+        today = timezone.localdate()
+        for model, display_upto in ((CatalogueAd, today), (CheckoutAd, today), (ProductAd, today - timedelta(days=1))):
+            model.objects.create(image="ads/x.jpg", display_upto=display_upto).display_in.add(restaurant)
+
+        restaurant.refresh_from_db()
+        with self.assertNumQueries(1):
+            ads = get_active_ads(restaurant)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_active_ads(restaurant), ads)
+        self.assertEqual([len(ads[placement]) for placement in PLACEMENTS], [1, 1, 0, 0])
+
+        VideoPageAd.objects.create(image="ads/x.jpg", display_upto=today).display_in.add(restaurant)
+        restaurant.refresh_from_db()
+        self.assertEqual(len(get_active_ads(restaurant)["video"]), 1)
+
+
+class CartConcurrencyTest(MenuTransactionTestCase):
+    def test_concurrent_taps_are_all_counted(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("In-memory SQLite test databases cannot serve concurrent writers")
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.first()
+        threads, taps = 8, 25
+
+        def tap(delta):
+            try:
+                for _ in range(taps):
+                    change_quantity(restaurant.pk, "session", option.pk, delta)
+            finally:
+                connections.close_all()
+
+        for delta in (1, -1):
+            workers = [Thread(target=tap, args=(delta,)) for _ in range(threads)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            if delta > 0:
+                self.assertEqual(CartItem.objects.get(product=option).quantity, threads * taps)
+        self.assertFalse(CartItem.objects.exists())
+
+
+class CartDecrementTest(MenuTestCase):
+    def test_increment_between_update_and_delete_is_kept(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.first()
+        change_quantity(restaurant.pk, "cart", option.pk, 1)
+        bumped = []
+
+        def increment_before_delete(execute, sql, params, many, context):
+            if sql.startswith("DELETE") and not bumped:
+                bumped.append(True)
+                CartItem.objects.filter(product=option).update(quantity=F("quantity") + 5)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(increment_before_delete):
+            self.assertEqual(change_quantity(restaurant.pk, "cart", option.pk, -1), 5)
+        self.assertEqual(CartItem.objects.get().quantity, 5)
+
+
+@override_settings(CART_STORE="web.cart.SessionCartStore")
+class SessionCartStoreTest(MenuTestCase):
+    def test_cart_is_kept_out_of_the_database(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.first()
+        params = {"restaurant_pk": restaurant.pk, "option": option.pk}
+        for _ in range(3):
+            self.client.get(reverse("web:cart_item_plus"), params)
+        response = self.client.get(reverse("web:cart_item_minus"), params)
+        self.assertEqual(response.json()["quantity"], 2)
+        self.assertFalse(CartItem.objects.exists())
+
+        response = self.client.get(reverse("web:checkout", kwargs={"pk": restaurant.pk}))
+        self.assertEqual([(item.product, item.quantity) for item in response.context["cart_items"]], [(option, 2)])
+
+        params["option"] = "not-an-option"
+        self.assertEqual(self.client.get(reverse("web:cart_item_plus"), params).status_code, 400)
+
+
+class CartSummaryTest(MenuTestCase):
+    def test_cart_is_read_in_one_query(self):
+        restaurant = self.create_restaurant("menu", 2)
+        url = reverse("web:checkout", kwargs={"pk": restaurant.pk})
+        params = {"restaurant_pk": restaurant.pk}
+        self.client.get(url)
+        queries = []
+        for option in Option.objects.order_by("price")[:3]:
+            for _ in range(2):
+                self.client.get(reverse("web:cart_item_plus"), {**params, "option": option.pk})
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(url)
+            queries.append(len(context))
+        self.assertEqual(len(set(queries)), 1)
+        self.assertEqual(response.context["total_price"], 2 * (100 + 100 + 101))
+        self.assertEqual(sorted(item.line_total for item in response.context["cart_items"]), [200, 200, 202])
+
+    def test_batched_changes(self):
+        restaurant = self.create_restaurant("menu", 1)
+        first, second = Option.objects.order_by("price")
+        url = reverse("web:cart_update", kwargs={"pk": restaurant.pk})
+
+        def post(changes):
+            return self.client.post(url, {"changes": changes}, content_type="application/json")
+
+        data = post({str(first.pk): 3, str(second.pk): 1}).json()
+        self.assertEqual(data["quantities"], {str(first.pk): 3, str(second.pk): 1})
+        self.assertEqual(Decimal(data["total"]), 420)
+        self.assertIn("Product 0-0", data["html"])
+
+        data = post({str(first.pk): -3, str(second.pk): 2}).json()
+        self.assertEqual(data["quantities"], {str(first.pk): 0, str(second.pk): 3})
+        self.assertEqual(Decimal(data["total"]), 360)
+
+        self.assertEqual(post({str(second.pk): -1, "not-an-option": 1}).status_code, 400)
+        self.assertEqual(post({str(second.pk): "x"}).status_code, 400)
+        self.assertEqual(CartItem.objects.get().quantity, 3)
+
+    def test_changes_are_checked_by_every_store(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.filter(product__subcategory__category__restaurant=restaurant).first()
+        self.create_restaurant("other", 1)
+        other = Option.objects.exclude(product__subcategory__category__restaurant=restaurant).first()
+        url = reverse("web:cart_update", kwargs={"pk": restaurant.pk})
+
+        def post(changes):
+            return self.client.post(url, {"changes": changes}, content_type="application/json")
+
+        for store in ("web.cart.DatabaseCartStore", "web.cart.SessionCartStore"):
+            with self.subTest(store=store), self.settings(CART_STORE=store):
+                for delta in (10**30, 100, -100):
+                    self.assertEqual(post({str(option.pk): delta}).status_code, 400)
+                self.assertEqual(post({str(other.pk): 1}).status_code, 400)
+                self.assertEqual(post({str(option.pk): 99}).json()["quantities"], {str(option.pk): 99})
+        self.assertEqual(CartItem.objects.get().quantity, 99)
+        response = self.client.post("/cart/menu/update/", {"changes": {}}, content_type="application/json")
+        self.assertEqual(response.status_code, 404)
+
+    def test_add_to_cart_takes_the_restaurant(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.order_by("price").first()
+        url = reverse("web:add_to_cart", kwargs={"restaurant_pk": restaurant.pk})
+        self.assertEqual(self.client.post(url, {"option_pk": option.pk, "quantity": 2}).status_code, 200)
+        response = self.client.get(url)
+        self.assertEqual(response.context["total_price"], 200)
+
+
+class CartSweepTest(MenuTestCase):
+    def test_idle_lines_are_deleted(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.first()
+        for cart_id in ("idle", "old", "recent", "new"):
+            CartItem.objects.create(restaurant=restaurant, session_key=cart_id, product=option)
+        CartItem.objects.filter(session_key__in=["idle", "old"]).update(updated_at=timezone.now() - timedelta(days=2))
+
+        self.assertEqual(sweep_carts(ttl=60 * 60 * 24, batch_size=1), 2)
+        self.assertEqual(set(CartItem.objects.values_list("session_key", flat=True)), {"recent", "new"})
+
+    def test_lines_tapped_during_the_sweep_are_kept(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.first()
+        CartItem.objects.create(restaurant=restaurant, session_key="idle", product=option)
+        CartItem.objects.update(updated_at=timezone.now() - timedelta(days=2))
+
+        def tap_before_delete(execute, sql, params, many, context):
+            if sql.startswith("DELETE"):
+                CartItem.objects.update(updated_at=timezone.now())
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(tap_before_delete):
+            self.assertEqual(sweep_carts(ttl=60 * 60 * 24), 0)
+        self.assertTrue(CartItem.objects.exists())
+
+
+class AnonymousSessionTest(MenuTestCase):
+    def test_browsing_starts_no_session(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.first()
+        response = self.client.get(restaurant.get_web_url())
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+        params = {"restaurant_pk": restaurant.pk, "option": option.pk}
+        response = self.client.get(reverse("web:cart_item_plus"), params)
+        self.assertIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+        self.assertEqual(self.client.get(reverse("web:cart_item_plus"), params).json()["quantity"], 2)
+
+    def test_signed_in_sessions_are_kept_on_the_server(self):
+        restaurant = self.create_restaurant("menu", 1)
+        option = Option.objects.order_by("price").first()
+        params = {"restaurant_pk": restaurant.pk, "option": option.pk}
+        self.client.get(reverse("web:cart_item_plus"), params)
+        self.client.get(reverse("web:cart_item_plus"), params)
+
+        User.objects.create_user("owner", password="secret")
+        self.client.login(username="owner", password="secret")
+        self.assertEqual(Session.objects.get().get_decoded()["_auth_user_id"], str(User.objects.get().pk))
+        self.client.get(reverse("web:minus_to_cart", kwargs={"option_pk": option.pk}))
+        response = self.client.get(reverse("web:checkout", kwargs={"pk": restaurant.pk}))
+        self.assertEqual(response.context["total_price"], 100)
+
+        self.client.logout()
+        self.assertFalse(Session.objects.exists())
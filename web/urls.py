@@ -8,9 +8,17 @@ urlpatterns = [
     path("", views.IndexView.as_view(), name="index"),
     path("catalogue/<str:pk>/", views.RestaurantCatalogueView.as_view(), name="restaurant_catalogue"),
     path("catalogue/<str:pk>/products/", views.RestaurantProductsView.as_view(), name="restaurant_products"),
+    path(
+        "catalogue/<uuid:pk>/products/feed/", views.RestaurantProductFeedView.as_view(), name="restaurant_product_feed"
+    ),
+    path("product/<uuid:pk>/", views.ProductDetailView.as_view(), name="product_detail"),
     path("category/<str:pk>/", views.CategoryView.as_view(), name="category_catalogue"),
     path("checkout/<str:pk>/", views.CheckoutView.as_view(), name="checkout"),
     path("view/catalogue/<str:slug>/", views.RestaurantCatalogueSlugView.as_view(), name="restaurant_slug_catalogue"),
     path("cart_item/plus/", views.CartItemPlusView.as_view(), name="cart_item_plus"),
     path("cart_item/minus/", views.CartItemMinusView.as_view(), name="cart_item_minus"),
+    path("cart/<uuid:pk>/update/", views.CartUpdateView.as_view(), name="cart_update"),
+    path("cart/<str:restaurant_pk>/add/", views.AddCartView.as_view(), name="add_to_cart"),
+    path("cart/<str:option_pk>/minus/", views.MinusCartView.as_view(), name="minus_to_cart"),
+    path("howitworks/<str:pk>/", views.HowItWorksView.as_view(), name="howitworks"),
 ]
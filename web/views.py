@@ -1,20 +1,28 @@
-from django.http import JsonResponse
-from django.shortcuts import render
-from django.utils import timezone
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404, render
+from django.template.loader import render_to_string
 from django.views import View
 from django.views.generic import DetailView, ListView
 from main.models import (
     Badge,
     Banner,
-    CartItem,
-    CatalogueAd,
     Category,
-    CheckoutAd,
     Notification,
+    Option,
     Product,
-    ProductAd,
     Restaurant,
 )
+from .ads import get_active_ads
+from .cache import MenuPageCacheMixin, render_product_fragment
+from .cart import get_cart_store
+from .catalogue import Catalogue
+from .feed import filter_products, paginate_products
+from .visitors import get_visitor_count, record_visit
 
 
 class IndexView(ListView):
@@ -24,91 +32,137 @@ class IndexView(ListView):
     paginate_by = 50
 
 
-class RestaurantCatalogueView(DetailView):
+class RestaurantCatalogueView(MenuPageCacheMixin, DetailView):
     model = Restaurant
     template_name = "web/catalogue.html"
     context_object_name = "restaurant"
 
-    def get_context_data(self, **kwargs):
-        restaurant = self.get_object()
-        if restaurant.visitor_count is None:
-            restaurant.visitor_count = 0
+    def get_restaurant(self):
+        return self.get_object()
 
-        # Increment visitor count
-        restaurant.visitor_count += 1
-        restaurant.save()
+    def page_viewed(self, restaurant):
+        record_visit(restaurant)
+
+    def get_context_data(self, **kwargs):
+        restaurant = self.object
+        restaurant.visitor_count = self.get_visitor_count(restaurant)
 
         context = super().get_context_data(**kwargs)
-        context["banners"] = Banner.objects.filter(restaurant=self.get_object())
-        context["notifications"] = Notification.objects.filter(restaurant=self.get_object())
-        context["product_ads"] = ProductAd.objects.filter(display_upto__gte=timezone.now(), display_in__in=[restaurant])
+        context["catalogue"] = Catalogue(restaurant)
+        context["banners"] = Banner.objects.filter(restaurant=restaurant)
+        context["notifications"] = Notification.objects.filter(restaurant=restaurant)
         return context
 
 
-class RestaurantCatalogueSlugView(DetailView):
+class RestaurantCatalogueSlugView(MenuPageCacheMixin, DetailView):
     model = Restaurant
     template_name = "web/catalogue.html"
     context_object_name = "restaurant"
 
-    def get_context_data(self, **kwargs):
-        restaurant = self.get_object()
-        if restaurant.visitor_count is None:
-            restaurant.visitor_count = 0
+    def get_restaurant(self):
+        return self.get_object()
+
+    def page_viewed(self, restaurant):
+        record_visit(restaurant)
 
-        # Increment visitor count
-        restaurant.visitor_count += 1
-        restaurant.save()
+    def get_context_data(self, **kwargs):
+        restaurant = self.object
+        restaurant.visitor_count = self.get_visitor_count(restaurant)
 
         context = super().get_context_data(**kwargs)
-        context["banners"] = Banner.objects.filter(restaurant=self.get_object())
-        context["notifications"] = Notification.objects.filter(restaurant=self.get_object())
-        context["product_ads"] = ProductAd.objects.filter(display_upto__gte=timezone.now(), display_in__in=[restaurant])
+        context["catalogue"] = Catalogue(restaurant)
+        context["banners"] = Banner.objects.filter(restaurant=restaurant)
+        context["notifications"] = Notification.objects.filter(restaurant=restaurant)
         return context
 
 
-class RestaurantProductsView(ListView):
+class RestaurantProductsView(MenuPageCacheMixin, ListView):
     model = Product
     template_name = "web/products.html"
 
+    def get_restaurant(self):
+        return self.get_object()
+
     def get_context_data(self, **kwargs):
         restaurant = self.get_object()
-        context = super().get_context_data(**kwargs)
+        products, next_cursor = paginate_products(
+            self.object_list, None, settings.PRODUCT_FEED_PAGE_SIZE, ranked=bool(self.request.GET.get("q"))
+        )
+        context = super().get_context_data(object_list=products, **kwargs)
         context["restaurant"] = restaurant
-        context["banners"] = Banner.objects.filter(restaurant=self.get_object())
-        context["notifications"] = Notification.objects.filter(restaurant=self.get_object())
-        context["product_ads"] = ProductAd.objects.filter(display_upto__gte=timezone.now(), display_in__in=[restaurant])
+        context["banners"] = Banner.objects.filter(restaurant=restaurant)
+        context["notifications"] = Notification.objects.filter(restaurant=restaurant)
+        context["next_cursor"] = next_cursor
         return context
 
     def get_object(self):
-        return Restaurant.objects.get(pk=self.kwargs["pk"])
+        if not hasattr(self, "restaurant"):
+            self.restaurant = get_object_or_404(Restaurant, pk=self.kwargs["pk"])
+        return self.restaurant
 
     def get_queryset(self):
-        request = self.request
-        products = Product.objects.filter(subcategory__category__restaurant=self.get_object())
-        if request.GET.get("q"):
-            query = request.GET.get("q")
-            print(query)
-            products = products.filter(name__icontains=query) | products.filter(description__icontains=query)
-        return products
+        return filter_products(self.get_object(), self.request.GET)
+
+
+class RestaurantProductFeedView(View):
+    """Further pages of the products page, as rendered cards plus the cursor of the next page."""
+
+    def get(self, request, pk):
+        restaurant = get_object_or_404(Restaurant, pk=pk)
+        products = filter_products(restaurant, request.GET)
+        try:
+            products, next_cursor = paginate_products(
+                products,
+                request.GET.get("cursor"),
+                settings.PRODUCT_FEED_PAGE_SIZE,
+                ranked=bool(request.GET.get("q")),
+            )
+        except ValueError:
+            return JsonResponse({"error": "Invalid cursor"}, status=400)
+        html = render_to_string("web/includes/product_feed.html", {"products": products}, request)
+        return JsonResponse({"html": html, "count": len(products), "next_cursor": next_cursor})
 
 
-class CategoryView(DetailView):
+class ProductDetailView(View):
+    """A product's modal, fetched by the menu pages the first time it is opened."""
+
+    def get(self, request, pk):
+        products = Product.objects.filter(is_active=True).with_prices().prefetch_related("option_set")
+        product = get_object_or_404(products.select_related("subcategory__category__restaurant"), pk=pk)
+        restaurant = product.subcategory.category.restaurant
+        product_ads = get_active_ads(restaurant)["product"]
+        cart_quantities = get_cart_store().get_quantities(request, restaurant)
+        return HttpResponse(
+            render_product_fragment("web/includes/product_modal.html", product, product_ads, cart_quantities)
+        )
+
+
+class CategoryView(MenuPageCacheMixin, DetailView):
     model = Category
     template_name = "web/category.html"
 
+    def get_queryset(self):
+        return Category.objects.select_related("restaurant")
+
+    def get_restaurant(self):
+        return self.get_object().restaurant
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        restaurant = self.get_object().restaurant
-        session_key = self.request.session.session_key
-        cart_items = CartItem.objects.filter(restaurant=restaurant, session_key=session_key)
+        restaurant = self.object.restaurant
+        catalogue = Catalogue(restaurant)
+        category = catalogue.get_category(self.object.pk)
+        cart_items, total_price = [], 0
+        if self.cart_quantities:
+            cart_items, total_price = get_cart_store().get_summary(self.request, restaurant)
         context["cart_items"] = cart_items
-        context["total_price"] = sum([cart_item.total_price() for cart_item in cart_items])
+        context["total_price"] = total_price
         context["restaurant"] = restaurant
+        context["catalogue"] = catalogue
+        context["subcategories"] = category.get_subcategories()
+        context["products"] = catalogue.get_products(category)
         context["banners"] = Banner.objects.filter(restaurant=restaurant)
-        context["catalogue_ads"] = CatalogueAd.objects.filter(
-            display_upto__gte=timezone.now(), display_in__in=[restaurant]
-        )
-        context["product_ads"] = ProductAd.objects.filter(display_upto__gte=timezone.now(), display_in__in=[restaurant])
+        context["catalogue_ads"] = get_active_ads(restaurant)["catalogue"]
         return context
 
 
@@ -119,58 +173,103 @@ class CheckoutView(DetailView):
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        restaurant = self.get_object()
-        if restaurant.visitor_count is None:
-            restaurant.visitor_count = 0
+        restaurant = self.object
+        record_visit(restaurant)
+        restaurant.visitor_count = get_visitor_count(restaurant)
 
-        # Increment visitor count
-        restaurant.visitor_count += 1
-        restaurant.save()
-
-        session_key = self.request.session.session_key
-        cart_items = CartItem.objects.filter(restaurant=restaurant, session_key=session_key)
+        cart_items, total_price = get_cart_store().get_summary(self.request, restaurant)
         context["banners"] = Banner.objects.filter(restaurant=restaurant)
         context["restaurant"] = restaurant
         context["cart_items"] = cart_items
-        context["total_price"] = sum([cart_item.total_price() for cart_item in cart_items])
-        context["checkout_ads"] = CheckoutAd.objects.filter(
-            display_upto__gte=timezone.now(), display_in__in=[restaurant]
-        )
-        context["product_ads"] = ProductAd.objects.filter(display_upto__gte=timezone.now(), display_in__in=[restaurant])
+        context["total_price"] = total_price
+        context["checkout_ads"] = get_active_ads(restaurant)["checkout"]
         return context
 
 
 class CartItemPlusView(View):
+    delta = 1
+
     def get(self, request):
-        option_pk = request.GET.get("option")
-        restaurant_pk = request.GET.get("restaurant_pk")
-        session_key = request.GET.get("session_key")
-        cart_item = CartItem.objects.get_or_create(
-            product_id=option_pk, restaurant_id=restaurant_pk, session_key=session_key
-        )[0]
-        cart_item.quantity += 1
-        cart_item.save()
-        response = {"success": True, "quantity": cart_item.quantity, "subtotal": cart_item.total_price()}
-        return JsonResponse(response)
-
-
-class CartItemMinusView(View):
-    def get(self, request):
-        option_pk = request.GET.get("option")
-        restaurant_pk = request.GET.get("restaurant_pk")
-        session_key = request.GET.get("session_key")
-        cart_item = CartItem.objects.get_or_create(
-            product_id=option_pk, restaurant_id=restaurant_pk, session_key=session_key
-        )[0]
-        print(cart_item.quantity, "*" * 20)
-        if cart_item.quantity > 1:
-            cart_item.quantity -= 1
-            cart_item.save()
-            response = {"success": True, "quantity": cart_item.quantity, "subtotal": cart_item.total_price()}
-        else:
-            cart_item.delete()
-            response = {"success": True, "quantity": 0, "subtotal": 0}
-        return JsonResponse(response)
+        try:
+            quantity = get_cart_store().change_quantity(
+                request, request.GET.get("restaurant_pk"), request.GET.get("option"), self.delta
+            )
+        except (ValidationError, IntegrityError):
+            return JsonResponse({"success": False}, status=400)
+        return JsonResponse({"success": True, "quantity": quantity})
+
+
+class CartItemMinusView(CartItemPlusView):
+    delta = -1
+
+
+class CartUpdateView(View):
+    """Apply a batch of taps on the +/- buttons, posted as JSON ``{"changes": {option pk: delta}}``.
+
+    Returns the new quantities of the changed lines, the cart total and the re-rendered cart panel.
+    """
+
+    max_changes = 100
+
+    def post(self, request, pk):
+        restaurant = get_object_or_404(Restaurant, pk=pk)
+        try:
+            changes = {option: int(delta) for option, delta in json.loads(request.body)["changes"].items()}
+        except (ValueError, TypeError, KeyError, AttributeError, OverflowError):
+            return JsonResponse({"success": False}, status=400)
+        if not changes or len(changes) > self.max_changes:
+            return JsonResponse({"success": False}, status=400)
+
+        store = get_cart_store()
+        try:
+            quantities = store.change_quantities(request, restaurant.pk, changes)
+        except (ValidationError, IntegrityError):
+            return JsonResponse({"success": False}, status=400)
+        cart_items, total_price = store.get_summary(request, restaurant)
+        context = {"restaurant": restaurant, "cart_items": cart_items, "total_price": total_price}
+        html = render_to_string("web/includes/cart.html", context, request)
+        return JsonResponse({"success": True, "quantities": quantities, "total": total_price, "html": html})
+
+
+class AddCartView(View):
+    def get(self, request, *args, **kwargs):
+        restaurant = get_object_or_404(Restaurant, pk=kwargs["restaurant_pk"])
+        cart_items, total_price = get_cart_store().get_summary(request, restaurant)
+        context = {"restaurant": restaurant, "cart_items": cart_items, "total_price": total_price}
+        return render(request, "web/includes/cart.html", context)
+
+    def post(self, request, *args, **kwargs):
+        option_pk = request.POST.get("option_pk")
+        try:
+            quantity = int(request.POST.get("quantity"))
+            get_cart_store().change_quantity(request, kwargs["restaurant_pk"], option_pk, quantity)
+        except (TypeError, ValueError, ValidationError, IntegrityError):
+            return JsonResponse({"message": "Invalid cart item"}, status=400)
+
+        return JsonResponse({"message": "Item added to cart successfully"})
+
+
+class MinusCartView(View):
+    def get(self, request, option_pk, *args, **kwargs):
+        try:
+            option = get_object_or_404(Option.objects.select_related("product__subcategory__category"), pk=option_pk)
+            restaurant_pk = option.product.subcategory.category.restaurant_id
+            get_cart_store().change_quantity(request, restaurant_pk, option.pk, -1)
+        except ValidationError:
+            return JsonResponse({"message": "Invalid cart item"}, status=400)
+
+        return JsonResponse({"message": "Product removed from cart successfully"})
+
+
+class HowItWorksView(DetailView):
+    template_name = "web/howitworks.html"
+    context_object_name = "restaurant"
+    model = Restaurant
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["banners"] = get_active_ads(self.object)["video"]
+        return context
 
 
 def handler404(request, exception):
@@ -0,0 +1,84 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.models import F
+from main.models import Restaurant
+
+logger = logging.getLogger(__name__)
+
+_pending = Counter()
+_lock = threading.Lock()
+_flusher = None
+
+
+def record_visit(restaurant):
+    """Count a page view for ``restaurant`` in this worker's buffer.
+
+    Page views never write to the Restaurant row; buffered counts are added
+    in batches by ``flush()`` from a background thread.
+    """
+    with _lock:
+        _pending[restaurant.pk] += 1
+    _start_flusher()
+
+
+def pending_visits(restaurant):
+    with _lock:
+        return _pending[restaurant.pk]
+
+
+def get_visitor_count(restaurant):
+    """The restaurant's visitor count including the visits this worker has not flushed yet."""
+    return restaurant.visitor_count + pending_visits(restaurant)
+
+
+def flush():
+    """Add the buffered visits to each restaurant with one atomic update per row."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    total = sum(pending.values())
+    try:
+        for pk, count in list(pending.items()):
+            Restaurant.objects.filter(pk=pk).update(visitor_count=F("visitor_count") + count)
+            del pending[pk]
+    except DatabaseError:
+        # Put back what was not written so the next flush retries it.
+        with _lock:
+            _pending.update(pending)
+        raise
+    return total
+
+
+def _run():
+    while True:
+        time.sleep(settings.VISITOR_COUNT_FLUSH_INTERVAL)
+        try:
+            flush()
+        except DatabaseError:
+            logger.exception("Could not flush visitor counts")
+        finally:
+            connections.close_all()
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except DatabaseError:
+        logger.exception("Could not flush visitor counts at exit")
+
+
+def _start_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_run, name="visitor-count-flusher", daemon=True)
+            _flusher.start()
+            atexit.register(_flush_at_exit)